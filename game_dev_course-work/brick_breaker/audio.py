@@ -0,0 +1,128 @@
+"""Sound effect voice pool for the brick breaker.
+
+Every effect category gets its own reserved mixer channels, so a burst of
+brick hits can never cut off the life-lost or level-complete sound, and
+Sound.play() (which only uses unreserved channels) cannot take them either.
+Within a category each sound may only play MAX_VOICES copies at once; one
+more trigger stops that sound's oldest voice and reuses it. Triggers of a
+sound within MERGE_WINDOW seconds of starting a voice of it are merged into
+that voice instead of starting another one.
+
+The mixer runs with a small buffer (see pre_init) to keep the time from a
+trigger to hearing it short. VoicePool times its play calls, and
+latency_bound_ms() adds a buffer's playback time to that: an estimated upper
+bound, not a measurement, since pygame cannot tell when a sound reaches the
+device (a channel reports busy as soon as play() returns).
+"""
+import time
+
+import pygame
+
+# Mixer setup for low latency: 44.1 kHz, 16-bit stereo and a 256-sample buffer (~6 ms)
+MIXER_FREQUENCY = 44100
+MIXER_BUFFER = 256
+
+# Reserved channels per effect category and the sounds in each
+CATEGORIES = {
+    'impact': (6, ('brick', 'paddle')),
+    'event': (2, ('life', 'level')),
+    'ui': (1, ('menu',)),
+}
+# Channels left unreserved for anything that calls Sound.play() directly
+UNRESERVED_CHANNELS = 4
+# Most copies of one sound playing at once (sounds not listed: 1)
+MAX_VOICES = {'brick': 4, 'paddle': 2}
+# Triggers of a sound this soon after it last started a voice are merged (seconds)
+MERGE_WINDOW = 0.03
+
+
+def pre_init():
+    """Ask for the low-latency mixer settings; call before pygame.init()."""
+    pygame.mixer.pre_init(MIXER_FREQUENCY, -16, 2, MIXER_BUFFER)
+
+
+class VoicePool:
+    """Plays the sounds in `sounds` (key -> pygame Sound) on reserved channels per category.
+
+    The dict is read at play time, so sounds can be added while it is in use.
+    """
+    def __init__(self, sounds, categories=CATEGORIES, max_voices=MAX_VOICES, merge_window=MERGE_WINDOW):
+        self.sounds = sounds
+        self.max_voices = max_voices
+        self.merge_window = merge_window
+        self.category_of = {}
+        self.channels = {}
+        # Per channel: [sound key, start time] of the voice last started on it
+        self.voices = {}
+        self.last_start = {}
+        self.triggers = self.merged = self.stolen = 0
+        self.play_time = 0.0
+        self.play_calls = 0
+        self.max_play_time = 0.0
+        if not pygame.mixer.get_init():
+            return
+
+        total = sum(count for count, _ in categories.values())
+        pygame.mixer.set_num_channels(total + UNRESERVED_CHANNELS)
+        pygame.mixer.set_reserved(total)
+        first = 0
+        for name, (count, keys) in categories.items():
+            self.channels[name] = [pygame.mixer.Channel(i) for i in range(first, first + count)]
+            for channel in self.channels[name]:
+                self.voices[channel] = [None, 0.0]
+            for key in keys:
+                self.category_of[key] = name
+            first += count
+
+    def play(self, key):
+        """Trigger sound `key`; returns the channel it plays on, or None if merged or unavailable."""
+        sound = self.sounds.get(key)
+        channels = self.channels.get(self.category_of.get(key))
+        if sound is None or not channels:
+            return None
+        self.triggers += 1
+        now = time.perf_counter()
+        playing = [c for c in channels if c.get_busy() and self.voices[c][0] == key]
+        if playing and now - self.last_start.get(key, 0.0) < self.merge_window:
+            self.merged += 1
+            return None
+
+        if len(playing) >= self.max_voices.get(key, 1):
+            # Too many copies of this sound: restart its oldest voice
+            channel = min(playing, key=lambda c: self.voices[c][1])
+            self.stolen += 1
+        else:
+            channel = next((c for c in channels if not c.get_busy()), None)
+            if channel is None:
+                # Category full: take over its oldest voice, whatever it plays
+                channel = min(channels, key=lambda c: self.voices[c][1])
+                self.stolen += 1
+
+        start = time.perf_counter()
+        channel.play(sound)
+        elapsed = time.perf_counter() - start
+        self.play_time += elapsed
+        self.play_calls += 1
+        self.max_play_time = max(self.max_play_time, elapsed)
+        self.voices[channel] = [key, now]
+        self.last_start[key] = now
+        return channel
+
+    def latency_bound_ms(self):
+        """(mean play call, buffer, total) estimated upper bound on trigger-to-mix latency, in ms.
+
+        A triggered sound is mixed into the next buffer, so on top of the play
+        call it waits at most one buffer's playback time; buffering in the
+        audio driver after the mixer is not counted.
+        """
+        init = pygame.mixer.get_init()
+        frequency = init[0] if init else MIXER_FREQUENCY
+        call = self.play_time / self.play_calls * 1000 if self.play_calls else 0.0
+        buffer = MIXER_BUFFER / frequency * 1000
+        return call, buffer, call + buffer
+
+    def summary(self):
+        call, buffer, total = self.latency_bound_ms()
+        return (f"{self.triggers} triggers, {self.merged} merged, {self.stolen} voices stolen; "
+                f"estimated latency upper bound {total:.1f} ms (play call {call * 1000:.0f} us, max {self.max_play_time * 1e6:.0f} us, "
+                f"buffer {buffer:.1f} ms)")
@@ -0,0 +1,632 @@
+"""Benchmarks for the brick breaker hot paths.
+
+Run from this folder, for example:
+
+    python benchmarks.py collisions
+    python benchmarks.py suite --save baseline.json
+    python benchmarks.py suite --compare baseline.json
+
+Everything runs under SDL's dummy drivers, so no window or sound device is needed.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from math import ceil, sqrt
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+import brick_breaker as bb
+
+
+def build_field(count, gap=5, start_y=80):
+    """Build `count` bricks laid out row by row on a roughly square grid."""
+    cols = max(bb.BRICK_COLS, int(ceil(sqrt(count))))
+    bricks = []
+    for i in range(count):
+        row, col = divmod(i, cols)
+        x = col * (bb.BRICK_WIDTH + gap) + gap
+        y = row * (bb.BRICK_HEIGHT + gap) + start_y
+        bricks.append(bb.Brick(x, y, i % 4))
+    return bricks
+
+
+def linear_scan(bricks, rect):
+    """The original collision scan: test every brick in list order."""
+    for brick in bricks[:]:
+        if rect.colliderect(brick.rect):
+            return brick
+    return None
+
+
+def grid_scan(grid, rect):
+    hits = [brick for brick in grid.query(rect) if rect.colliderect(brick.rect)]
+    if not hits:
+        return None
+    return min(hits, key=lambda b: (b.rect.top, b.rect.left))
+
+
+def time_per_call(func, args_list, repeat=3):
+    """Best-of-`repeat` mean time per call in microseconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in args_list:
+            func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(args_list) * 1e6
+
+
+def bench_collisions(sizes, queries, seed):
+    rng = random.Random(seed)
+    print(f"{'bricks':>8} {'linear us':>12} {'grid us':>10} {'speedup':>9}")
+    for count in sizes:
+        bricks = build_field(count)
+        grid = bb.BrickGrid()
+        for brick in bricks:
+            grid.insert(brick)
+
+        # Ball positions spread over the whole field, so some hit and some miss
+        right = max(b.rect.right for b in bricks)
+        bottom = max(b.rect.bottom for b in bricks) + 100
+        rects = [pygame.Rect(rng.randrange(0, right), rng.randrange(0, bottom), bb.BALL_SIZE, bb.BALL_SIZE)
+                 for _ in range(queries)]
+
+        for rect in rects:
+            if linear_scan(bricks, rect) is not grid_scan(grid, rect):
+                raise AssertionError(f"grid and linear scan disagree at {rect}")
+
+        linear = time_per_call(linear_scan, [(bricks, r) for r in rects])
+        gridded = time_per_call(grid_scan, [(grid, r) for r in rects])
+        print(f"{count:>8} {linear:>12.2f} {gridded:>10.2f} {linear / gridded:>8.1f}x")
+
+
+def bench_render(frames, seed):
+    """Per-frame cost of the full redraw vs the dirty-rect renderer during play."""
+    print(f"{'mode':>6} {'us/frame':>10} {'px/frame':>10}")
+    for mode in ('full', 'dirty'):
+        random.seed(seed)
+        game = bb.Game()
+        game.state = bb.STATE_PLAYING
+        pixels = 0
+        elapsed = 0.0
+        for i in range(frames):
+            game.paddle.rect.centerx = game.ball.rect.centerx
+            game.tick()
+            if game.state != bb.STATE_PLAYING:
+                game.reset_game()
+                game.state = bb.STATE_PLAYING
+            start = time.perf_counter()
+            if mode == 'dirty':
+                rects = game.renderer.draw(game)
+            else:
+                game.draw_game()
+                rects = None
+            game.presenter.present(game.screen, rects)
+            if rects is None:
+                pixels += bb.SCREEN_WIDTH * bb.SCREEN_HEIGHT
+            else:
+                pixels += sum(r.width * r.height for r in rects)
+            elapsed += time.perf_counter() - start
+        print(f"{mode:>6} {elapsed / frames * 1e6:>10.1f} {pixels // frames:>10}")
+
+
+def step_ball_objects(balls, grid, paddle_rect):
+    """Reference for the multi-ball benchmark: one tick for a list of Ball
+    objects with the handle_collisions rules (bricks are not destroyed)."""
+    for ball in balls:
+        ball.move()
+        rect = ball.rect
+        if rect.left <= 0 or rect.right >= bb.SCREEN_WIDTH:
+            ball.dx = abs(ball.dx) if rect.left <= 0 else -abs(ball.dx)
+            rect.left = max(rect.left, 1)
+            rect.right = min(rect.right, bb.SCREEN_WIDTH - 1)
+            ball.sync()
+        if rect.top <= 0:
+            ball.dy = abs(ball.dy)
+            rect.top = 1
+            ball.sync()
+        if rect.colliderect(paddle_rect) and ball.dy > 0:
+            ball.dx = (rect.centerx - paddle_rect.centerx) / (bb.PADDLE_WIDTH / 2) * 6
+            ball.dy *= -1
+            ball.place(ball.x, paddle_rect.top - 1 - bb.BALL_SIZE)
+        hits = [b for b in grid.query(rect) if rect.colliderect(b.rect)]
+        if hits:
+            brick = min(hits, key=lambda b: (b.rect.top, b.rect.left))
+            dx1 = abs(rect.right - brick.rect.left)
+            dx2 = abs(rect.left - brick.rect.right)
+            dy1 = abs(rect.bottom - brick.rect.top)
+            dy2 = abs(rect.top - brick.rect.bottom)
+            if min(dx1, dx2) <= min(dy1, dy2):
+                ball.dx *= -1
+            else:
+                ball.dy *= -1
+        if rect.top > bb.SCREEN_HEIGHT:
+            # Keep the population constant: re-launch from the middle
+            ball.place(bb.SCREEN_WIDTH / 2, bb.SCREEN_HEIGHT / 2)
+            ball.dy = -abs(ball.dy)
+
+
+def bench_multiball(counts, ticks, seed):
+    import numpy as np
+    import multiball
+
+    print(f"{'balls':>7} {'objects balls/ms':>17} {'arrays balls/ms':>16} {'speedup':>9}")
+    bricks = build_field(60)
+    grid = bb.BrickGrid()
+    for brick in bricks:
+        grid.insert(brick)
+    paddle_rect = pygame.Rect(bb.SCREEN_WIDTH // 2 - bb.PADDLE_WIDTH // 2, bb.SCREEN_HEIGHT - 50,
+                              bb.PADDLE_WIDTH, bb.PADDLE_HEIGHT)
+    for count in counts:
+        rng = random.Random(seed)
+        starts = [(rng.uniform(20, bb.SCREEN_WIDTH - 40), rng.uniform(320, 500),
+                   rng.choice([-4, -3, 3, 4]), -4) for _ in range(count)]
+
+        balls = []
+        for x, y, dx, dy in starts:
+            ball = bb.Ball(x, y)
+            ball.place(x, y)
+            ball.dx, ball.dy = dx, dy
+            balls.append(ball)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            step_ball_objects(balls, grid, paddle_rect)
+        objects = count * ticks / ((time.perf_counter() - start) * 1000)
+
+        field = multiball.BrickField(bricks, grid.cell_width, grid.cell_height)
+        system = multiball.BallSystem(count, bb.BALL_SIZE)
+        arr = np.array(starts, dtype=np.float64)
+        system.spawn(0, 0, arr[:, 2], arr[:, 3])
+        system.pos[:count] = arr[:, :2]
+        start = time.perf_counter()
+        for _ in range(ticks):
+            system.step(field, paddle_rect, bb.SCREEN_WIDTH, bb.SCREEN_HEIGHT)
+            if system.count < count:
+                # Same re-launch as the reference so the ball count stays fixed
+                lost = count - system.count
+                system.spawn(bb.SCREEN_WIDTH / 2, bb.SCREEN_HEIGHT / 2, np.full(lost, 3.0), np.full(lost, -4.0))
+        arrays = count * ticks / ((time.perf_counter() - start) * 1000)
+        print(f"{count:>7} {objects:>17.0f} {arrays:>16.0f} {arrays / objects:>8.1f}x")
+
+
+# Scenarios of the benchmark suite and the functions measured in each
+SUITE_SCENARIOS = {
+    'level3': ['handle_collisions', 'update_ball', 'create_bricks', 'draw_game', 'draw_hud', 'Brick.draw'],
+    'nearly_cleared': ['handle_collisions', 'update_ball', 'draw_game', 'draw_hud', 'Brick.draw'],
+    'field_5000': ['handle_collisions', 'update_ball', 'create_bricks', 'draw_game', 'draw_hud', 'Brick.draw'],
+    'fast_ball': ['handle_collisions', 'update_ball'],
+}
+
+
+def write_dense_level(folder, rows=50, cols=100, bricks=None, grid=None):
+    """A level file of rows * cols small bricks (5,000 by default) covering the play area.
+
+    By default every brick has a random plain or silver colour; `bricks` and
+    `grid` (in the level file format) replace that.
+    """
+    path = os.path.join(folder, 'level_01.json')
+    with open(path, 'w') as f:
+        json.dump({
+            'name': f'{rows * cols} bricks',
+            'brick_width': 7, 'brick_height': 7, 'left': 0, 'top': 80, 'gap': 1,
+            'bricks': bricks or {'?': {'random': [0, 4]}},
+            'grid': grid or ['?' * cols] * rows,
+        }, f)
+
+
+def build_scenario(name, seed, dense_levels):
+    """A headless game in the PLAYING state set up for one suite scenario."""
+    game = bb.Game(headless=True, seed=seed)
+    if name == 'field_5000':
+        game.levels = dense_levels
+    else:
+        game.level = 3
+    game.reset_level()
+    if name == 'nearly_cleared':
+        # Leave five bricks, picked with the game's RNG so every run keeps the same ones
+        keep = set(game.rng.sample(range(len(game.bricks)), 5))
+        for i, brick in enumerate(list(game.bricks)):
+            if i not in keep:
+                game.remove_brick(brick)
+    elif name == 'fast_ball':
+        game.ball.dx, game.ball.dy = 11, -15
+    game.state = bb.STATE_PLAYING
+    return game
+
+
+def time_ball_steps(name, seed, dense_levels, swept, calls):
+    """Mean seconds per collision step over `calls` ticks of play.
+
+    The paddle follows the ball so play goes on; a game that ends its level or
+    loses the ball is rebuilt outside the timed region.
+    """
+    game = None
+    elapsed = 0.0
+    for i in range(calls):
+        if game is None or game.state != bb.STATE_PLAYING:
+            game = build_scenario(name, seed + i, dense_levels)
+            game.swept_collisions = swept
+        game.paddle.rect.centerx = game.ball.rect.centerx
+        game.ball.snap()
+        if swept:
+            start = time.perf_counter()
+            game.update_ball()
+            elapsed += time.perf_counter() - start
+        else:
+            game.ball.move()
+            start = time.perf_counter()
+            game.handle_collisions()
+            elapsed += time.perf_counter() - start
+    return elapsed / calls
+
+
+def time_calls(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls
+
+
+def measure(name, function, seed, dense_levels, calls):
+    """Mean seconds per call of `function` in scenario `name`."""
+    if function in ('handle_collisions', 'update_ball'):
+        return time_ball_steps(name, seed, dense_levels, function == 'update_ball', calls)
+    game = build_scenario(name, seed, dense_levels)
+    if function == 'create_bricks':
+        return time_calls(game.create_bricks, max(1, calls // 100))
+    if function == 'draw_game':
+        return time_calls(game.draw_game, max(1, calls // 10))
+    if function == 'draw_hud':
+        return time_calls(game.draw_hud, calls)
+    if function == 'Brick.draw':
+        bricks = game.bricks
+        start = time.perf_counter()
+        for _ in range(max(1, calls // len(bricks))):
+            for brick in bricks:
+                brick.draw(game.screen)
+        return (time.perf_counter() - start) / (max(1, calls // len(bricks)) * len(bricks))
+    raise ValueError(f'unknown function {function}')
+
+
+def run_suite(scenarios, calls, repeat, seed):
+    """{'scenario/function': best us per call} over `repeat` runs, with the GC off while timing."""
+    folder = tempfile.mkdtemp(prefix='bb_bench_')
+    try:
+        write_dense_level(folder)
+        import levels
+        dense_levels = levels.LevelLibrary(folder)
+        gc.disable()
+        results = {}
+        for name in scenarios:
+            for function in SUITE_SCENARIOS[name]:
+                runs = [measure(name, function, seed, dense_levels, calls) for _ in range(repeat)]
+                results[f'{name}/{function}'] = min(runs) * 1e6
+        return results
+    finally:
+        gc.enable()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def compare(results, baseline, tolerance):
+    """Print results next to a baseline; returns the keys slower than baseline * (1 + tolerance)."""
+    regressions = []
+    print(f"{'benchmark':<36} {'us/call':>10} {'baseline':>10} {'change':>8}")
+    for key, value in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f'{key:<36} {value:>10.2f} {"-":>10} {"new":>8}')
+            continue
+        change = value / base - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print(f'{key:<36} {value:>10.2f} {base:>10.2f} {change:>+7.0%}{flag}')
+    return regressions
+
+
+def bench_suite(args):
+    scenarios = args.scenarios or list(SUITE_SCENARIOS)
+    results = run_suite(scenarios, args.calls, args.repeat, args.seed)
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {", ".join(regressions)}')
+            status = 1
+    else:
+        for key, value in results.items():
+            print(f'{key:<36} {value:>10.2f} us')
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'pygame': pygame.version.ver,
+                'machine': platform.platform(),
+                'calls': args.calls,
+                'seed': args.seed,
+                'results': results,
+            }, f, indent=2)
+        print(f'Baseline written to {args.save}')
+    return status
+
+
+def bench_env(num_envs, workers, steps, seed):
+    """Environment steps per second: one BrickBreakerEnv in this process, then a VectorEnv."""
+    import numpy as np
+    import env
+
+    rng = np.random.default_rng(seed)
+    single = env.BrickBreakerEnv(seed)
+    single.reset()
+    actions = rng.integers(0, 3, steps).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = single.step(action)
+        if terminated or truncated:
+            single.reset()
+    rate = steps / (time.perf_counter() - start)
+    print(f"{'single env':<24} {rate:>12,.0f} steps/s")
+
+    with env.VectorEnv(num_envs, workers, seed) as vec:
+        vec.reset()
+        batches = max(1, steps // num_envs)
+        actions = rng.integers(0, 3, (batches, num_envs))
+        start = time.perf_counter()
+        for batch in actions:
+            vec.step(batch)
+        rate = batches * num_envs / (time.perf_counter() - start)
+    print(f"{f'vector ({num_envs} envs, {len(vec.conns)} workers)':<24} {rate:>12,.0f} steps/s")
+
+
+def bench_endless(ticks, windows, seed):
+    """An autopilot endless game with unlimited lives: tick cost, live bricks and memory over time.
+
+    Only Game.tick is timed; the autopilot's own work is left out.
+    """
+    import tracemalloc
+
+    game = bb.Game(headless=True, seed=seed)
+    game.reset_game(seed, endless_mode=True)
+    game.state = bb.STATE_READY
+    pilot = bb.Autopilot(seed)
+    per_window = max(1, ticks // windows)
+    tracemalloc.start()
+    print(f"{'ticks':>9} {'level':>6} {'rows':>7} {'bricks':>7} {'us/tick':>9} {'memory KB':>10}")
+    for window in range(windows):
+        spent = 0.0
+        most = 0
+        for _ in range(per_window):
+            game.lives = 3
+            left, right = pilot(game)
+            start = time.perf_counter()
+            game.tick(left, right, game.state == bb.STATE_READY)
+            spent += time.perf_counter() - start
+            most = max(most, len(game.bricks))
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0] / 1024
+        print(f"{(window + 1) * per_window:>9,} {game.level:>6} {game.endless.rows_entered:>7} {most:>7} "
+              f"{spent / per_window * 1e6:>9.1f} {memory:>10.0f}")
+    tracemalloc.stop()
+
+
+def bench_capture(frames, fps, file_format, scale, seed):
+    """Capture `frames` game frames paced at `fps`: game-loop cost per frame and frames dropped."""
+    import capture
+
+    game = bb.Game(headless=True, seed=seed)
+    game.state = bb.STATE_PLAYING
+    folder = tempfile.mkdtemp(prefix='bb_capture_')
+    try:
+        recorder = capture.FrameCapture(folder, game.screen.get_size(), file_format, scale)
+        next_frame = time.perf_counter()
+        for _ in range(frames):
+            game.paddle.rect.centerx = game.ball.rect.centerx
+            game.tick()
+            game.draw_game()
+            recorder.capture(game.screen)
+            next_frame += 1 / fps
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+        print(recorder.close())
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def bench_highscores(sessions, seed):
+    """High-score store with `sessions` games recorded: record() cost, index load and rebuild."""
+    import highscores
+
+    rng = random.Random(seed)
+    folder = tempfile.mkdtemp(prefix='bb_scores_')
+    try:
+        store = highscores.HighScores(folder)
+        start = time.perf_counter()
+        for _ in range(sessions):
+            store.record(rng.randrange(0, 20000), rng.randint(1, 15), rng.random() < 0.05, rng.randrange(2 ** 32),
+                         rng.uniform(30, 900))
+        per_record = (time.perf_counter() - start) / sessions
+        store.flush()
+        store.close()
+
+        start = time.perf_counter()
+        highscores.HighScores(folder).load()
+        indexed = time.perf_counter() - start
+        os.remove(os.path.join(folder, 'index.json'))
+        # A game over straight after startup, with the index to rebuild: only the
+        # writer thread waits for it, not the caller
+        store = highscores.HighScores(folder)
+        start = time.perf_counter()
+        store.start()
+        ticket = store.record(20000, 15, True)
+        cold_record = time.perf_counter() - start
+        store.flush()
+        ranked = time.perf_counter() - start
+        store.close()
+        if store.rank(ticket) != 1:
+            print(f"Warning: top score ranked {store.rank(ticket)}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    print(f"{sessions:,} sessions")
+    print(f"{'record() on the caller':<24} {per_record * 1e6:>10.1f} us")
+    print(f"{'load from index':<24} {indexed * 1000:>10.2f} ms")
+    print(f"{'record() at cold start':<24} {cold_record * 1e6:>10.1f} us")
+    print(f"{'ranked after rebuild':<24} {ranked * 1000:>10.2f} ms")
+
+
+def bench_cascade(rows, cols, density, seed, repeat):
+    """A chain reaction set off in the corner of a rows * cols field of small bricks.
+
+    Times the hit that resolves the whole chain (one tick, best of `repeat`
+    fresh fields), then the ticks over which its bursts play out. Fails if
+    either takes longer than a tick.
+    """
+    import levels
+    try:
+        import particles
+    except ImportError:
+        particles = None
+
+    rng = random.Random(seed)
+    grid = [''.join('X' if rng.random() < density else 'R' for _ in range(cols)) for _ in range(rows)]
+    grid[0] = 'X' + grid[0][1:]
+    folder = tempfile.mkdtemp(prefix='bb_cascade_')
+    try:
+        write_dense_level(folder, rows, cols, {'X': {'color': bb.EXPLOSIVE}, 'R': {'color': 0}}, grid)
+        game = bb.Game(headless=True, seed=seed)
+        game.levels = levels.LevelLibrary(folder)
+        resolve = float('inf')
+        for _ in range(repeat):
+            game.reset_level()
+            game.effects.clear()
+            game.state = bb.STATE_PLAYING
+            total = len(game.bricks)
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                game.hit_brick(game.brick_cells[0])
+                resolve = min(resolve, time.perf_counter() - start)
+            finally:
+                gc.enable()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    if particles is not None:
+        game.particles = particles.ParticleSystem(bb.BRICK_COLORS, bb.BACKGROUND)
+    destroyed = total - len(game.bricks)
+    rings = (game.effects[-1][0] - game.effect_clock) // bb.BLAST_WAVE_TICKS if game.effects else 0
+
+    # The part of Game.tick_input that plays the effects
+    ticks = 0
+    worst = 0.0
+    while game.effects:
+        start = time.perf_counter()
+        game.effect_clock += 1
+        game.play_effects()
+        if game.particles is not None:
+            game.particles.update()
+        worst = max(worst, time.perf_counter() - start)
+        ticks += 1
+    print(f"{total:,} bricks ({density:.0%} explosive): {destroyed:,} destroyed in {rings} rings")
+    print(f"{'chain resolved in':<24} {resolve * 1000:>10.2f} ms")
+    print(f"{'effects played over':<24} {ticks:>10} ticks ({ticks / bb.TICK_RATE:.1f} s), worst {worst * 1000:.2f} ms")
+    if max(resolve, worst) > bb.TICK_TIME:
+        print(f'Over the {bb.TICK_TIME * 1000:.1f} ms tick budget')
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('collisions', help='grid index vs linear scan for ball-vs-brick queries')
+    p.add_argument('--sizes', type=int, nargs='+', default=[50, 1000, 10000])
+    p.add_argument('--queries', type=int, default=2000)
+    p.add_argument('--seed', type=int, default=1)
+
+    p = sub.add_parser('render', help='full redraw vs dirty-rect renderer')
+    p.add_argument('--frames', type=int, default=2000)
+    p.add_argument('--seed', type=int, default=1)
+
+    p = sub.add_parser('multiball', help='NumPy ball system vs looping over Ball objects')
+    p.add_argument('--balls', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    p.add_argument('--ticks', type=int, default=200)
+    p.add_argument('--seed', type=int, default=1)
+
+    p = sub.add_parser('suite', help='per-call latency of the game hot paths over fixed scenarios')
+    p.add_argument('--scenarios', nargs='+', choices=list(SUITE_SCENARIOS), help='default: all')
+    p.add_argument('--calls', type=int, default=2000, help='collision steps per measurement; the '
+                   'slower functions use a fraction of this')
+    p.add_argument('--repeat', type=int, default=5, help='the best of this many runs is reported')
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--save', metavar='PATH', help='write the results as a JSON baseline')
+    p.add_argument('--compare', metavar='PATH', help='compare against a saved baseline; exits 1 on regressions')
+    p.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before a '
+                   'benchmark counts as a regression (default 0.25 = 25%%)')
+
+    p = sub.add_parser('env', help='steps per second of the training environment, single and vectorised')
+    p.add_argument('--envs', type=int, default=16)
+    p.add_argument('--workers', type=int, default=None, help='default: one per CPU')
+    p.add_argument('--steps', type=int, default=20000)
+    p.add_argument('--seed', type=int, default=1)
+
+    p = sub.add_parser('endless', help='endless mode cost over a long session')
+    p.add_argument('--ticks', type=int, default=60000)
+    p.add_argument('--windows', type=int, default=6)
+    p.add_argument('--seed', type=int, default=1)
+
+    p = sub.add_parser('capture', help='frame capture cost on the game loop and frames dropped')
+    p.add_argument('--frames', type=int, default=600)
+    p.add_argument('--fps', type=float, default=60)
+    p.add_argument('--format', choices=('png', 'raw'), default='png')
+    p.add_argument('--scale', type=int, default=1)
+    p.add_argument('--seed', type=int, default=1)
+
+    p = sub.add_parser('highscores', help='high-score store load and record times with many sessions')
+    p.add_argument('--sessions', type=int, default=50000)
+    p.add_argument('--seed', type=int, default=1)
+
+    p = sub.add_parser('cascade', help='explosive brick chain reaction across a large field')
+    p.add_argument('--rows', type=int, default=100)
+    p.add_argument('--cols', type=int, default=100)
+    p.add_argument('--density', type=float, default=1.0, help='share of the bricks that are explosive')
+    p.add_argument('--repeat', type=int, default=3, help='the best of this many chains is reported')
+    p.add_argument('--seed', type=int, default=1)
+
+    args = parser.parse_args(argv)
+    if args.command == 'collisions':
+        bench_collisions(args.sizes, args.queries, args.seed)
+    elif args.command == 'render':
+        bench_render(args.frames, args.seed)
+    elif args.command == 'multiball':
+        bench_multiball(args.balls, args.ticks, args.seed)
+    elif args.command == 'env':
+        bench_env(args.envs, args.workers, args.steps, args.seed)
+    elif args.command == 'endless':
+        bench_endless(args.ticks, args.windows, args.seed)
+    elif args.command == 'capture':
+        bench_capture(args.frames, args.fps, args.format, args.scale, args.seed)
+    elif args.command == 'highscores':
+        bench_highscores(args.sessions, args.seed)
+    elif args.command == 'cascade':
+        return bench_cascade(args.rows, args.cols, args.density, args.seed, args.repeat)
+    elif args.command == 'suite':
+        return bench_suite(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,37 @@
 import pygame
+import os
 import sys
+import time
 import random
-from math import sqrt
+import csv
+from array import array
+from math import sqrt, cos, sin, pi, floor, ceil
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
-# Initialize Pygame
+# Startup reference point for the time-to-first-frame measurement
+START_TIME = time.perf_counter()
+
+# Multi-ball physics and brick particles are array based and need numpy; the game runs without them
+try:
+    import multiball
+    import particles
+except ImportError:
+    multiball = None
+    particles = None
+
+import replay
+import levels
+import audio
+import rewind
+import levelgen
+import highscores
+import endless
+import capture
+import spectator
+
+# Initialize Pygame (with a small mixer buffer so effects play promptly)
+audio.pre_init()
 pygame.init()
 pygame.font.init()
 # Try to initialize the mixer for audio; continue gracefully if unavailable
@@ -24,6 +52,45 @@ BRICK_HEIGHT = 30
 BRICK_ROWS = 5
 BRICK_COLS = 10
 FPS = 60
+# Physics runs at a fixed rate; speeds are in pixels per tick at this rate
+TICK_RATE = 60
+TICK_TIME = 1.0 / TICK_RATE
+# Longest frame that is caught up on; anything slower is dropped instead of replayed
+MAX_FRAME_TIME = 0.25
+# 'dirty' only redraws and presents what changed during play; 'full' redraws everything
+RENDER_MODE = 'dirty'
+# The game always draws at SCREEN_WIDTH x SCREEN_HEIGHT and is scaled to the window:
+# 'smooth' fills as much of the window as possible, 'integer' keeps pixels square and sharp
+SCALE_MODE = 'smooth'
+# Height of the HUD band at the top of the play screen
+HUD_HEIGHT = 70
+# Extra balls released by the multi-ball power-up (M) and the stress mode (Shift+M)
+MULTIBALL_COUNT = 3
+MULTIBALL_STRESS_COUNT = 500
+MULTIBALL_CAPACITY = 5000
+# Seconds of play that holding R can rewind
+REWIND_SECONDS = rewind.REWIND_SECONDS
+# Generated levels played after the level files, and the seed they are generated from
+GENERATED_LEVELS = 12
+LEVEL_SEED = 1
+
+# Frame capture (F8 or --capture): where F8 captures go, and how much they are scaled down
+CAPTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'captures')
+CAPTURE_SCALE = 2
+
+# Frame timing: phases of one Game.run frame, in order, and how many frames are kept
+FRAME_PHASES = ('wait', 'events', 'update', 'draw', 'present')
+FRAME_HISTORY = 600
+# Swept (continuous) ball collisions stop fast balls tunnelling through bricks
+SWEPT_COLLISIONS = True
+MAX_CONTACTS_PER_STEP = 8
+
+# Assets resolve relative to this file, not the current directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOUND_DIRS = [
+    os.path.join(BASE_DIR, 'assets', 'sounds'),
+    os.path.join(BASE_DIR, os.pardir, 'assets', 'sounds'),
+]
 
 # Colors
 BACKGROUND = (15, 10, 35)
@@ -40,8 +107,20 @@ BRICK_COLORS = [
     (50, 200, 50, 200),    # Green - 30 points
     (255, 255, 50, 200),   # Yellow - 40 points
     (200, 200, 200, 200),  # Silver - 50 points (2 hits required)
-    (255, 215, 0, 200)     # Gold - 100 points
+    (255, 215, 0, 200),    # Gold - 100 points
+    (255, 60, 140, 200)    # Explosive - 70 points, damages the bricks around it
 ]
+EXPLOSIVE = 6
+
+# A brick's (row, col) as one int, row * CELL_STRIDE + col, so a neighbour's key is one addition away
+CELL_STRIDE = 1 << 16
+# Cells around an exploding brick (as key offsets) that its blast damages
+BLAST_OFFSETS = [dr * CELL_STRIDE + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+# Ticks between one ring of a chain reaction and the next, for its effects
+BLAST_WAVE_TICKS = 2
+# Chain-reaction bursts started per tick at most, and the particles in each
+EFFECTS_PER_TICK = 48
+CHAIN_PARTICLES = 12
 
 # Game states
 STATE_MENU = 0
@@ -57,6 +136,8 @@ class Paddle:
         self.rect = pygame.Rect(x, y, PADDLE_WIDTH, PADDLE_HEIGHT)
         self.speed = 8
         self.color = PADDLE_COLOR
+        # Position at the start of the current tick, for render interpolation
+        self.prev_x = self.rect.x
         
     def move(self, direction, screen_width):
         if direction == "left" and self.rect.left > 0:
@@ -64,13 +145,26 @@ class Paddle:
         if direction == "right" and self.rect.right < screen_width:
             self.rect.x += self.speed
             
-    def draw(self, screen):
+    def render_rect(self, alpha=1.0):
+        rect = self.rect.copy()
+        rect.x = round(self.prev_x + (self.rect.x - self.prev_x) * alpha)
+        return rect
+            
+    def draw(self, screen, alpha=1.0):
         # Draw paddle with a slight 3D effect
-        pygame.draw.rect(screen, self.color, self.rect, border_radius=8)
-        pygame.draw.rect(screen, (150, 80, 200), self.rect, 3, border_radius=8)
+        rect = self.render_rect(alpha)
+        pygame.draw.rect(screen, self.color, rect, border_radius=8)
+        pygame.draw.rect(screen, (150, 80, 200), rect, 3, border_radius=8)
+        return rect
+
+# Fonts are built once per (name, size, bold) and shared by every caller
+_fonts = {}
 
 # Safe font helper: prefer bundled/default font to avoid blocking SysFont calls
 def safe_font(name, size, bold=False):
+    key = (name, size, bold)
+    if key in _fonts:
+        return _fonts[key]
     try:
         f = pygame.font.Font(None, size)
         if bold and f:
@@ -78,22 +172,74 @@ def safe_font(name, size, bold=False):
                 f.set_bold(True)
             except Exception:
                 pass
-        return f
     except Exception:
-        return None
+        f = None
+    _fonts[key] = f
+    return f
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces keyed by (font, text, colour).
+
+    Text that does not change between frames (labels, an unchanged score) is
+    rasterised once and then reused.
+    """
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = font.render(text, True, color)
+        self.entries[key] = surf
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return surf
+
+text_cache = TextCache()
+
+def render_text(font, text, color):
+    return text_cache.render(font, text, color)
 
 class Ball:
-    def __init__(self, x, y):
+    def __init__(self, x, y, rng=random):
         self.rect = pygame.Rect(x, y, BALL_SIZE, BALL_SIZE)
-        self.dx = random.choice([-4, -3, 3, 4])
+        # Float position; rect is the rounded copy used for drawing and overlap tests
+        self.x = float(x)
+        self.y = float(y)
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.dx = rng.choice([-4, -3, 3, 4])
         self.dy = -4
         self.color = BALL_COLOR
         self.speed_increase_counter = 0
         self.max_speed = 8
         
     def move(self):
-        self.rect.x += self.dx
-        self.rect.y += self.dy
+        self.place(self.x + self.dx, self.y + self.dy)
+
+    def place(self, x, y):
+        self.x = x
+        self.y = y
+        self.rect.x = round(x)
+        self.rect.y = round(y)
+
+    def sync(self):
+        # Pick up the position after code moved self.rect directly
+        self.x = float(self.rect.x)
+        self.y = float(self.rect.y)
+
+    def snap(self):
+        # Forget the previous position after a teleport so it is not interpolated
+        self.prev_x = self.x
+        self.prev_y = self.y
         
     def increase_speed(self):
         if abs(self.dx) < self.max_speed and abs(self.dy) < self.max_speed:
@@ -101,30 +247,576 @@ class Ball:
             self.dy *= 1.1
             self.speed_increase_counter = 0
             
-    def draw(self, screen):
+    def render_center(self, alpha=1.0):
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        return round(x) + BALL_SIZE // 2, round(y) + BALL_SIZE // 2
+            
+    def draw(self, screen, alpha=1.0):
         # Draw ball with a glowing effect
-        pygame.draw.circle(screen, self.color, self.rect.center, BALL_SIZE // 2)
-        pygame.draw.circle(screen, (255, 255, 200), self.rect.center, BALL_SIZE // 4)
+        center = self.render_center(alpha)
+        drawn = pygame.draw.circle(screen, self.color, center, BALL_SIZE // 2)
+        pygame.draw.circle(screen, (255, 255, 200), center, BALL_SIZE // 4)
+        return drawn
+
+# Pre-rendered ball look, for blitting many balls at once
+_ball_sprite = None
+
+def get_ball_sprite():
+    global _ball_sprite
+    if _ball_sprite is None:
+        _ball_sprite = pygame.Surface((BALL_SIZE, BALL_SIZE), pygame.SRCALPHA)
+        center = (BALL_SIZE // 2, BALL_SIZE // 2)
+        pygame.draw.circle(_ball_sprite, BALL_COLOR, center, BALL_SIZE // 2)
+        pygame.draw.circle(_ball_sprite, (255, 255, 200), center, BALL_SIZE // 4)
+        if pygame.display.get_surface() is not None:
+            _ball_sprite = _ball_sprite.convert_alpha()
+    return _ball_sprite
+
+class BrickAtlas:
+    """Every brick look for one brick size, pre-rendered once into a single surface.
+
+    Row n holds BRICK_COLORS[n] and column k the brick with k + 1 hits left, so
+    drawing a brick is a blit of one area instead of rasterising rounded rects.
+    """
+    MAX_HITS = 9
+
+    def __init__(self, width, height):
+        self.surface = pygame.Surface((width * self.MAX_HITS, height * len(BRICK_COLORS)), pygame.SRCALPHA)
+        self.areas = {}
+        for color_index, color in enumerate(BRICK_COLORS):
+            for hits_left in range(1, self.MAX_HITS + 1):
+                area = pygame.Rect((hits_left - 1) * width, color_index * height, width, height)
+                self.areas[(color_index, hits_left)] = area
+                # Same look as drawing straight onto the (opaque) screen
+                pygame.draw.rect(self.surface, color[:3], area, border_radius=4)
+                pygame.draw.rect(self.surface, (255, 255, 255), area, 2, border_radius=4)
+                # Show hit count for silver bricks and any brick with hits to spare
+                if color_index == EXPLOSIVE:
+                    pygame.draw.circle(self.surface, (90, 0, 30), area.center, min(width, height) // 4)
+                if color_index == 4 or hits_left > 1:
+                    font = safe_font(None, 20)
+                    text = font.render(str(hits_left), True, (0, 0, 0))
+                    self.surface.blit(text, (area.centerx - 5, area.centery - 8))
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+
+# One atlas per brick size, built on first use
+_brick_atlases = {}
+
+def get_brick_atlas(width, height):
+    atlas = _brick_atlases.get((width, height))
+    if atlas is None:
+        atlas = _brick_atlases[(width, height)] = BrickAtlas(width, height)
+    return atlas
 
 class Brick:
-    def __init__(self, x, y, color_index):
-        self.rect = pygame.Rect(x, y, BRICK_WIDTH, BRICK_HEIGHT)
+    def __init__(self, x, y, color_index, hits_required=None, width=BRICK_WIDTH, height=BRICK_HEIGHT,
+                 row=-1, col=-1):
+        self.rect = pygame.Rect(x, y, width, height)
         self.color_index = color_index
         self.color = BRICK_COLORS[color_index]
         self.points = (color_index + 1) * 10
-        self.hits_required = 2 if color_index == 4 else 1  # Silver bricks require 2 hits
+        # Silver bricks require 2 hits unless the level says otherwise
+        self.hits_required = hits_required or levels.default_hits(color_index)
         self.hits = 0
+        # Cell of the brick in its level's grid, and as a Game.brick_cells key (-1: not in a grid)
+        self.row = row
+        self.col = col
+        self.cell = row * CELL_STRIDE + col if row >= 0 and 0 <= col < CELL_STRIDE else -1
+        self.slot = -1  # index in Game.bricks, kept up to date for O(1) removal
+        self.index = -1  # index in Game.level_bricks, which rewinds use to find it again
+        self.atlas = get_brick_atlas(self.rect.width, self.rect.height)
+
+    def sprite_area(self):
+        hits_left = min(self.hits_required - self.hits, BrickAtlas.MAX_HITS)
+        return self.atlas.areas[(self.color_index, hits_left)]
         
     def draw(self, screen):
-        # Draw brick with a border
-        pygame.draw.rect(screen, self.color, self.rect, border_radius=4)
-        pygame.draw.rect(screen, (255, 255, 255, 100), self.rect, 2, border_radius=4)
-        
-        # Show hit count for silver bricks
-        if self.color_index == 4 and self.hits_required > 1:
-            font = safe_font(None, 20)
-            text = font.render(str(self.hits_required - self.hits), True, (0, 0, 0))
-            screen.blit(text, (self.rect.centerx - 5, self.rect.centery - 8))
+        screen.blit(self.atlas.surface, self.rect, self.sprite_area())
+
+def sweep_aabb(x, y, w, h, dx, dy, rect):
+    """Swept AABB test of a w*h box at (x, y) moving by (dx, dy) against rect.
+
+    Returns (t, axis) for the first contact, with t in [0, 1] the fraction of the
+    move done when the box touches rect and axis 'x', 'y' or 'xy' (a corner) the
+    face normal. Returns None when the box does not run into rect, including when
+    it already overlaps it or is moving away from it.
+    """
+    if dx > 0:
+        x_entry = (rect.left - (x + w)) / dx
+        x_exit = (rect.right - x) / dx
+    elif dx < 0:
+        x_entry = (rect.right - x) / dx
+        x_exit = (rect.left - (x + w)) / dx
+    elif x + w <= rect.left or x >= rect.right:
+        return None
+    else:
+        x_entry, x_exit = float('-inf'), float('inf')
+
+    if dy > 0:
+        y_entry = (rect.top - (y + h)) / dy
+        y_exit = (rect.bottom - y) / dy
+    elif dy < 0:
+        y_entry = (rect.bottom - y) / dy
+        y_exit = (rect.top - (y + h)) / dy
+    elif y + h <= rect.top or y >= rect.bottom:
+        return None
+    else:
+        y_entry, y_exit = float('-inf'), float('inf')
+
+    entry = max(x_entry, y_entry)
+    if entry < 0 or entry > 1 or entry >= min(x_exit, y_exit):
+        return None
+    if x_entry == y_entry:
+        return entry, 'xy'
+    return entry, 'x' if x_entry > y_entry else 'y'
+
+class BrickGrid:
+    """Uniform grid of cells mapping each cell to the bricks that overlap it.
+
+    Collision queries only look at the cells a rect touches, so their cost
+    depends on how many bricks are near the ball rather than on the total.
+    """
+    def __init__(self, cell_width=BRICK_WIDTH + 5, cell_height=BRICK_HEIGHT + 5):
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.cells = {}
+
+    def cell_range(self, rect):
+        return (rect.left // self.cell_width, (rect.right - 1) // self.cell_width,
+                rect.top // self.cell_height, (rect.bottom - 1) // self.cell_height)
+
+    def insert(self, brick):
+        x0, x1, y0, y1 = self.cell_range(brick.rect)
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                # Buckets are dicts used as ordered sets: O(1) removal, insertion order kept
+                self.cells.setdefault((cx, cy), {})[brick] = None
+
+    def remove(self, brick):
+        x0, x1, y0, y1 = self.cell_range(brick.rect)
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket is not None and brick in bucket:
+                    del bucket[brick]
+                    if not bucket:
+                        del self.cells[(cx, cy)]
+
+    def query(self, rect):
+        """Return the bricks sharing at least one cell with rect (a broad phase)."""
+        x0, x1, y0, y1 = self.cell_range(rect)
+        if x0 == x1 and y0 == y1:
+            return list(self.cells.get((x0, y0), ()))
+        found = {}
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return list(found)
+
+    def clear(self):
+        self.cells.clear()
+
+class Autopilot:
+    """Plays the paddle by predicting where the ball comes down.
+
+    The ball's path is ray-cast from its position through wall and brick
+    reflections, with the same contact rules as Game.sweep_ball, down to the
+    paddle's height. A prediction is kept until the ball's velocity or the
+    bricks change, so most ticks cost one tuple comparison. Called with a game
+    it returns the (left, right) paddle input, like the paddles in headless.py,
+    and it can only move the paddle at its normal speed.
+    """
+    MAX_BOUNCES = 64
+
+    def __init__(self, seed=None, max_offset=PADDLE_WIDTH // 3):
+        # Aiming a random distance off-centre keeps the bounce angle changing
+        self.rng = random.Random(seed)
+        self.max_offset = max_offset
+        self.key = None
+        self.target = None
+        self.calls = 0
+        self.predictions = 0
+
+    def __call__(self, game):
+        self.calls += 1
+        ball = game.ball
+        paddle = game.paddle
+        if game.state != STATE_PLAYING:
+            return False, False
+        key = (ball.dx, ball.dy, game.brick_version)
+        if key != self.key:
+            self.key = key
+            self.predictions += 1
+            landing = self.predict(game)
+            self.target = None
+            if landing is not None:
+                self.target = landing + self.rng.uniform(-self.max_offset, self.max_offset)
+        # Without a prediction (e.g. the ball is already past the paddle) just follow it
+        target = self.target if self.target is not None else ball.rect.centerx
+        error = target - paddle.rect.centerx
+        return error < -paddle.speed / 2, error > paddle.speed / 2
+
+    def predict(self, game):
+        """The ball's centre x when it next comes down to the paddle, or None."""
+        ball = game.ball
+        grid = game.brick_grid
+        x, y, dx, dy = ball.x, ball.y, ball.dx, ball.dy
+        floor_y = game.paddle.rect.top - BALL_SIZE
+        if dy > 0 and y > floor_y:
+            return None
+        step = min(grid.cell_width, grid.cell_height)
+        # Hits left of the bricks the predicted path has hit so far
+        health = {}
+        for _ in range(self.MAX_BOUNCES):
+            # Time to the next side wall and to the ceiling or paddle line
+            tx = ty = float('inf')
+            if dx < 0:
+                tx = -x / dx
+            elif dx > 0:
+                tx = (SCREEN_WIDTH - BALL_SIZE - x) / dx
+            if dy < 0:
+                ty = -y / dy
+            elif dy > 0:
+                ty = (floor_y - y) / dy
+            leg = max(0.0, min(tx, ty))
+            if leg == float('inf'):
+                return None
+
+            # March along the leg a cell at a time so each brick query stays small
+            pieces = max(1, ceil(max(abs(dx), abs(dy)) * leg / step))
+            mx, my = dx * leg / pieces, dy * leg / pieces
+            hit = None
+            for i in range(pieces):
+                px, py = x + mx * i, y + my * i
+                sweep = pygame.Rect(int(min(px, px + mx)) - 1, int(min(py, py + my)) - 1,
+                                    int(abs(mx)) + BALL_SIZE + 3, int(abs(my)) + BALL_SIZE + 3)
+                for brick in grid.query(sweep):
+                    if health.get(brick, 1) <= 0:
+                        continue
+                    contact = sweep_aabb(px, py, BALL_SIZE, BALL_SIZE, mx, my, brick.rect)
+                    if contact and (hit is None or contact[0] < hit[0]):
+                        hit = (contact[0], contact[1], brick)
+                if hit:
+                    hit = ((i + hit[0]) / pieces,) + hit[1:]
+                    break
+
+            if hit:
+                t, axis, brick = hit
+                x, y = x + dx * leg * t, y + dy * leg * t
+                health[brick] = health.get(brick, brick.hits_required - brick.hits) - 1
+                if 'x' in axis:
+                    dx = -dx
+                if 'y' in axis:
+                    dy = -dy
+                continue
+
+            x, y = x + dx * leg, y + dy * leg
+            if leg == ty:
+                if dy > 0:
+                    return x + BALL_SIZE / 2
+                dy = -dy
+            if leg == tx:
+                dx = -dx
+        return None
+
+class DirtyRenderer:
+    """Draws the play screen by only touching what changed since the last frame.
+
+    Bricks and the HUD live on a cached background layer. A brick hit patches
+    just that brick's area of the layer and a HUD change patches the HUD band;
+    a scrolling field moves its part of the layer and patches what it uncovers.
+    Each frame the areas the ball and paddle covered last frame are restored
+    from the layer, the ball and paddle are drawn again, and draw() returns the
+    rects to pass to pygame.display.update (or None when the whole screen must
+    be presented).
+    """
+    # Stale areas past which redrawing the whole layer is cheaper than patching (e.g. a chain reaction)
+    MAX_STALE = 64
+
+    def __init__(self):
+        self.layer = None
+        self.stale = []          # layer areas to redraw, e.g. hit bricks
+        self.hud_values = None   # what the HUD on the layer currently shows
+        self.moving_rects = []   # ball/paddle areas drawn last frame
+        self.scrolled = []       # layer areas scrolled since the last frame, to copy to the screen
+        self.screen_valid = False
+
+    def invalidate(self, rect=None):
+        """Mark a layer area (or, with no rect, the whole layer) out of date."""
+        if rect is None:
+            self.layer = None
+            self.stale = []
+        elif self.layer is not None:
+            # With no layer everything is drawn afresh anyway
+            self.stale.append(pygame.Rect(rect))
+            if len(self.stale) > self.MAX_STALE:
+                self.layer = None
+                self.stale = []
+
+    def scroll(self, area, dy):
+        """Move what the layer shows in `area` down by dy pixels, e.g. a scrolling brick field.
+
+        Only the strip this uncovers at the top of the area is redrawn. Pending
+        stale areas in it move along, so they still cover what they marked.
+        """
+        if self.layer is None:
+            return
+        area = pygame.Rect(area)
+        self.stale += [rect.move(0, dy) for rect in self.stale if rect.colliderect(area)]
+        self.layer.set_clip(area)
+        self.layer.scroll(0, dy)
+        self.layer.set_clip(None)
+        self.scrolled.append(area)
+        self.invalidate((area.x, area.y, area.width, dy))
+
+    def invalidate_screen(self):
+        # Something else drew on the screen, so present it all next time
+        self.screen_valid = False
+
+    def patch(self, game, rect):
+        # Repaint one area of the layer: background, the bricks there, the HUD
+        self.layer.fill(BACKGROUND, rect)
+        self.layer.set_clip(rect)
+        for brick in game.brick_grid.query(rect):
+            self.layer.blit(brick.atlas.surface, brick.rect, brick.sprite_area())
+        if rect.top < HUD_HEIGHT:
+            game.draw_hud(self.layer)
+        self.layer.set_clip(None)
+
+    def draw(self, game, alpha=1.0):
+        screen = game.screen
+        hud_values = (game.score, game.lives, game.level, game.bricks_broken, game.total_bricks)
+        patched = []
+        if self.layer is None or self.layer.get_size() != screen.get_size():
+            self.layer = pygame.Surface(screen.get_size())
+            self.layer.fill(BACKGROUND)
+            game.draw_bricks(self.layer)
+            game.draw_hud(self.layer)
+            self.hud_values = hud_values
+            self.stale = []
+            self.screen_valid = False
+        else:
+            if hud_values != self.hud_values:
+                self.hud_values = hud_values
+                self.stale.append(pygame.Rect(0, 0, screen.get_width(), HUD_HEIGHT))
+            for rect in self.stale:
+                self.patch(game, rect)
+                patched.append(rect)
+            self.stale = []
+            patched += self.scrolled
+        self.scrolled = []
+
+        if self.screen_valid:
+            for rect in self.moving_rects + patched:
+                screen.blit(self.layer, rect, rect)
+        else:
+            screen.blit(self.layer, (0, 0))
+
+        # Draw paddle and ball, interpolated between the last two physics ticks
+        moving = [game.paddle.draw(screen, alpha), game.ball.draw(screen, alpha)]
+        moving += game.draw_multiball(screen)
+        moving += game.draw_particles(screen)
+        dirty = None
+        if self.screen_valid:
+            dirty = self.moving_rects + patched + moving
+        self.moving_rects = moving
+        self.screen_valid = True
+        return dirty
+
+class Presenter:
+    """Shows the fixed-size logical screen in a window of any size.
+
+    Each frame the logical surface is scaled in one step straight into the
+    letterboxed area of the window. Everything that depends on the window size
+    (scale, letterbox, mouse mapping) is worked out once in resize(), so the
+    game itself only ever draws at SCREEN_WIDTH x SCREEN_HEIGHT.
+    """
+    def __init__(self, window, size, mode=SCALE_MODE):
+        self.size = size
+        self.mode = mode
+        self.resize(window)
+
+    def resize(self, window):
+        self.window = window
+        width, height = self.size
+        window_width, window_height = window.get_size()
+        scale = min(window_width / width, window_height / height)
+        if self.mode == 'integer' and scale >= 1:
+            scale = int(scale)
+        self.scale = scale
+        w, h = max(1, round(width * scale)), max(1, round(height * scale))
+        self.dest = pygame.Rect((window_width - w) // 2, (window_height - h) // 2, w, h)
+        self.target = window.subsurface(self.dest)
+        self.identity = self.dest.size == self.size
+        # Dirty rects map exactly onto the window at 1:1 and integer scales;
+        # otherwise every frame is scaled and presented whole
+        self.partial = self.identity or (self.mode == 'integer' and scale == int(scale))
+        # Letterbox bars are only drawn here; frames never touch them
+        window.fill((0, 0, 0))
+        self.full = True
+
+    def to_logical(self, pos):
+        """Window coordinates (e.g. of the mouse) to logical screen coordinates."""
+        return (floor((pos[0] - self.dest.x) / self.scale), floor((pos[1] - self.dest.y) / self.scale))
+
+    def present(self, surface, dirty_rects=None):
+        """Show `surface` in the window; only `dirty_rects` of it when given and possible."""
+        if self.full or dirty_rects is None or not self.partial:
+            if self.identity:
+                self.target.blit(surface, (0, 0))
+            elif self.mode == 'smooth':
+                pygame.transform.smoothscale(surface, self.dest.size, self.target)
+            else:
+                pygame.transform.scale(surface, self.dest.size, self.target)
+            pygame.display.flip()
+            self.full = False
+            return
+        bounds = surface.get_rect()
+        updated = []
+        for rect in dirty_rects:
+            rect = rect.clip(bounds)
+            if not rect.width or not rect.height:
+                continue
+            if self.identity:
+                self.target.blit(surface, rect, rect)
+                updated.append(rect.move(self.dest.topleft))
+            else:
+                s = int(self.scale)
+                out = pygame.Rect(self.dest.x + rect.x * s, self.dest.y + rect.y * s, rect.width * s, rect.height * s)
+                pygame.transform.scale(surface.subsurface(rect), out.size, self.window.subsurface(out))
+                updated.append(out)
+        pygame.display.update(updated)
+
+class FrameTimer:
+    """Per-phase timings of the last `size` frames in a ring buffer.
+
+    Game.run calls mark(phase) as each phase ends, which records the time since
+    the previous mark, and end_frame() after the last one. Statistics are only
+    computed while the overlay is shown; optionally every frame is also written
+    to a CSV file.
+    """
+    def __init__(self, size=FRAME_HISTORY, phases=FRAME_PHASES):
+        self.size = size
+        self.phases = phases
+        self.samples = {phase: array('d', bytes(8 * size)) for phase in phases}
+        self.frames = 0
+        self.index = 0
+        self.last = time.perf_counter()
+        self.visible = False
+        self.stats = None
+        self.csv_file = None
+        self.csv_writer = None
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.samples[phase][self.index] = now - self.last
+        self.last = now
+
+    def end_frame(self):
+        if self.csv_writer is not None:
+            row = [self.samples[phase][self.index] * 1000 for phase in self.phases]
+            self.csv_writer.writerow([self.frames] + [f"{ms:.3f}" for ms in row] + [f"{sum(row):.3f}"])
+        self.frames += 1
+        self.index = self.frames % self.size
+        # Refresh the overlay numbers twice a second rather than every frame
+        if self.visible and (self.stats is None or self.frames % (FPS // 2) == 0):
+            self.stats = self.compute_stats()
+
+    def compute_stats(self):
+        """{phase: (mean, p95, p99)} in milliseconds over the buffered frames."""
+        n = min(self.frames, self.size)
+        stats = {}
+        totals = [0.0] * n
+        for phase in self.phases:
+            values = self.samples[phase][:n]
+            for i, value in enumerate(values):
+                totals[i] += value
+            stats[phase] = self.summarize(values)
+        stats['total'] = self.summarize(totals)
+        return stats
+
+    @staticmethod
+    def summarize(values):
+        if not values:
+            return (0.0, 0.0, 0.0)
+        ordered = sorted(values)
+        n = len(ordered)
+        return (sum(ordered) / n * 1000, ordered[min(n - 1, int(n * 0.95))] * 1000,
+                ordered[min(n - 1, int(n * 0.99))] * 1000)
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.stats = None
+
+    def start_csv(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.csv_file = open(path, 'w', newline='')
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(['frame'] + [f"{phase}_ms" for phase in self.phases] + ['total_ms'])
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = self.csv_writer = None
+
+    def draw(self, surface):
+        """Draw the overlay panel in the top-right corner and return its rect."""
+        font = safe_font('Consolas', 14)
+        lines = [f"{'ms':<8}{'mean':>7}{'p95':>7}{'p99':>7}"]
+        for name in self.phases + ('total',):
+            mean, p95, p99 = self.stats[name]
+            lines.append(f"{name:<8}{mean:>7.2f}{p95:>7.2f}{p99:>7.2f}")
+        texts = [render_text(font, line, (220, 220, 220)) for line in lines]
+        width = max(t.get_width() for t in texts) + 12
+        rect = pygame.Rect(surface.get_width() - width - 5, HUD_HEIGHT + 5, width, len(texts) * 16 + 8)
+        surface.fill((20, 20, 30), rect)
+        for i, text in enumerate(texts):
+            surface.blit(text, (rect.x + 6, rect.y + 4 + i * 16))
+        return rect
+
+class AssetLoader:
+    """Runs asset loading jobs on a background thread pool.
+
+    The main loop calls poll() once per frame to collect the jobs that have
+    finished, so each asset can be used as soon as it is ready while the first
+    screens keep drawing.
+    """
+    def __init__(self, jobs, workers=4):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='assets')
+        self.pending = {self.pool.submit(job): key for key, job in jobs.items()}
+        self.total = len(self.pending)
+        self.done = 0
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def finished(self):
+        return not self.pending
+
+    def poll(self):
+        """Return (key, result) for each job finished since the last poll."""
+        results = []
+        for future in [f for f in self.pending if f.done()]:
+            key = self.pending.pop(future)
+            self.done += 1
+            try:
+                results.append((key, future.result()))
+            except Exception as e:
+                print(f"Warning: failed to load {key}: {e}")
+        if not self.pending and self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.started
+            self.pool.shutdown(wait=False)
+        return results
 
 class Button:
     def __init__(self, x, y, width, height, text, action=None):
@@ -139,7 +831,7 @@ class Button:
         pygame.draw.rect(screen, (255, 255, 255), self.rect, 3, border_radius=10)
         
         font = safe_font('Arial', 28, bold=True)
-        text_surf = font.render(self.text, True, TEXT_COLOR)
+        text_surf = render_text(font, self.text, TEXT_COLOR)
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
         
@@ -154,12 +846,30 @@ class Button:
         return None
 
 class Game:
-    def __init__(self):
-        # Allow window to be resized / maximized by the OS
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
-        pygame.display.set_caption("Castle Defender - Brick Breaker")
+    def __init__(self, headless=False, seed=None):
+        # Headless games (batch simulation, CI) open no window and load no audio;
+        # drawing still works, into an off-screen surface nobody presents
+        self.headless = headless
+        self.window = None
+        self.presenter = None
+        self.fullscreen = False
+        self.autopilot = None
+        if headless:
+            self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        else:
+            # Allow window to be resized / maximized by the OS; the game draws on a
+            # fixed-size screen that the presenter scales to whatever the window is
+            self.window = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
+            pygame.display.set_caption("Castle Defender - Brick Breaker")
+            self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.presenter = Presenter(self.window, self.screen.get_size())
         self.clock = pygame.time.Clock()
         
+        # Level layouts come from the level files (see levels.py), then the level generator
+        self.levels = levels.LevelLibrary(generator=levelgen.LevelGenerator(LEVEL_SEED, GENERATED_LEVELS))
+        if not self.levels.count:
+            print(f"Warning: no level files found in {self.levels.folder}")
+        
         # Game state
         self.state = STATE_MENU
         self.score = 0
@@ -172,6 +882,41 @@ class Game:
         self.paddle = None
         self.ball = None
         self.bricks = []
+        # Every brick the current level started with, destroyed ones included
+        self.level_bricks = []
+        # Snapshots of the last REWIND_SECONDS for rewinding with R; headless games skip them
+        self.rewind = None if headless else rewind.Rewind(REWIND_SECONDS * TICK_RATE)
+        # Finished games go into the high-score table (see highscores.py); headless ones do not
+        self.high_scores = None if headless else highscores.HighScores()
+        if self.high_scores is not None:
+            # Loads the table in the background, well before the first game over
+            self.high_scores.start()
+        # Table rank of the game that just ended, and whether that game has been recorded
+        self.score_ticket = None
+        self.session_recorded = False
+        # Extra balls of the multi-ball power-up, and the bricks as arrays for them
+        self.multiball = None
+        self.brick_field = None
+        self.brick_grid = BrickGrid()
+        # Bricks by cell key (see CELL_STRIDE), so an explosion finds its neighbours without a scan of the bricks
+        self.brick_cells = {}
+        # Bricks destroyed in chain reactions whose effects are still to play, as (due tick, bricks)
+        # per ring, and the tick count
+        self.effects = deque()
+        self.effect_clock = 0
+        # Bumped on every brick change, so cached predictions know when to redo their work
+        self.brick_version = 0
+        # Bumped when the bricks are laid out afresh (a new level, a rewind), for spectators (see spectator.py);
+        # and how far the endless field has scrolled down in all, which they follow from the deltas
+        self.layout_version = 0
+        self.scroll_offset = 0
+        self.swept_collisions = SWEPT_COLLISIONS
+        self.render_mode = RENDER_MODE
+        self.renderer = DirtyRenderer()
+        # Shatter effect of destroyed bricks; purely visual, so headless games skip it
+        self.particles = None
+        if particles is not None and not headless:
+            self.particles = particles.ParticleSystem(BRICK_COLORS, BACKGROUND)
         
         # UI elements
         self.buttons = []
@@ -179,20 +924,39 @@ class Game:
         
         # Sounds
         self.sounds = {}
+        # Effects play through a pool of reserved channels (see audio.py)
+        self.voices = audio.VoicePool(self.sounds)
         self.bgm_loaded = False
-        self.load_sounds()
+        self.assets = None
+        self.time_to_first_frame = None
+        self.frame_timer = FrameTimer()
+        # Presented frames are copied to a writer process while capturing (see capture.py)
+        self.capture = None
+        # Every tick is streamed to spectators while broadcasting (see spectator.py)
+        self.broadcast = None
+        if not headless:
+            self.load_sounds()
+        
+        # All gameplay randomness comes from this generator, seeded per game, so a
+        # seed plus the per-tick input (see replay.py) reproduces a session exactly
+        self.rng = random.Random()
+        self.seed = None
+        self.recorder = None
+        # The scrolling field of an endless game (see endless.py), None in the campaign
+        self.endless = None
         
         # Initialize game
-        self.reset_game()
+        self.reset_game(seed)
         
     def create_menu_buttons(self):
         center_x = SCREEN_WIDTH // 2
         button_width = 200
         button_height = 50
         self.buttons = [
-            Button(center_x - button_width//2, 250, button_width, button_height, "Start Game", "start"),
-            Button(center_x - button_width//2, 320, button_width, button_height, "Instructions", "instructions"),
-            Button(center_x - button_width//2, 390, button_width, button_height, "Quit", "quit")
+            Button(center_x - button_width//2, 230, button_width, button_height, "Start Game", "start"),
+            Button(center_x - button_width//2, 295, button_width, button_height, "Endless", "endless"),
+            Button(center_x - button_width//2, 360, button_width, button_height, "Instructions", "instructions"),
+            Button(center_x - button_width//2, 425, button_width, button_height, "Quit", "quit")
         ]
         
     def create_game_over_buttons(self):
@@ -204,11 +968,21 @@ class Game:
             Button(center_x - button_width//2, 320, button_width, button_height, "Menu", "menu"),
             Button(center_x - button_width//2, 390, button_width, button_height, "Quit", "quit")
         ]
-    def reset_game(self):
+    def reset_game(self, seed=None, endless_mode=False):
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng.seed(self.seed)
+        self.endless = endless.EndlessField(self, self.seed) if endless_mode else None
+        if not self.headless:
+            # Keep a replay of every session so F9 can save it for a bug report
+            flags = ((replay.FLAG_SWEPT if self.swept_collisions else 0) |
+                     (replay.FLAG_ENDLESS if endless_mode else 0))
+            self.recorder = replay.ReplayRecorder(self.seed, flags)
         self.score = 0
         self.lives = 3
         self.level = 1
         self.bricks_broken = 0
+        self.score_ticket = None
+        self.session_recorded = False
         self.reset_level()
         
     def reset_level(self):
@@ -219,14 +993,18 @@ class Game:
         
         ball_x = SCREEN_WIDTH // 2 - BALL_SIZE // 2
         ball_y = paddle_y - BALL_SIZE - 10
-        self.ball = Ball(ball_x, ball_y)
+        self.ball = Ball(ball_x, ball_y, self.rng)
         
         # Create bricks based on level
         self.create_bricks()
 
     def load_sounds(self):
-        """Load optional sound files from assets/sounds/. Files are optional; missing files are ignored."""
-        sound_dir = 'assets/sounds'
+        """Start decoding the optional sound files in the background. Missing files are ignored.
+
+        Sounds become playable one by one as update_assets picks them up.
+        """
+        if not pygame.mixer.get_init():
+            return
         files = {
             'brick': 'brick_hit.wav',
             'paddle': 'paddle_hit.wav',
@@ -235,27 +1013,30 @@ class Game:
             'menu': 'menu_select.wav',
             'bgm': 'bgm.mp3'
         }
+        jobs = {}
         for key, fname in files.items():
-            path = f"{sound_dir}/{fname}"
-            try:
-                if key == 'bgm':
-                    # Background music handled separately. Try mp3 first, then fallback to wav.
-                    if pygame.mixer.get_init():
-                        import os
-                        if os.path.exists(path):
-                            pygame.mixer.music.load(path)
-                            pygame.mixer.music.set_volume(0.2)
-                        else:
-                            # try .wav fallback
-                            wavpath = path.rsplit('.', 1)[0] + '.wav'
-                            if os.path.exists(wavpath):
-                                pygame.mixer.music.load(wavpath)
-                                pygame.mixer.music.set_volume(0.2)
-                else:
-                    if pygame.mixer.get_init() and __import__('os').path.exists(path):
-                        self.sounds[key] = pygame.mixer.Sound(path)
-            except Exception as e:
-                print(f"Warning: failed to load sound {path}: {e}")
+            # Background music: try mp3 first, then fall back to wav
+            names = [fname, fname.rsplit('.', 1)[0] + '.wav'] if key == 'bgm' else [fname]
+            path = next((os.path.join(d, n) for n in names for d in SOUND_DIRS
+                         if os.path.exists(os.path.join(d, n))), None)
+            if path is None:
+                continue
+            if key == 'bgm':
+                jobs[key] = lambda path=path: pygame.mixer.music.load(path)
+            else:
+                jobs[key] = lambda path=path: pygame.mixer.Sound(path)
+        self.assets = AssetLoader(jobs)
+
+    def update_assets(self):
+        for key, result in self.assets.poll():
+            if key == 'bgm':
+                pygame.mixer.music.set_volume(0.2)
+                self.bgm_loaded = True
+            else:
+                self.sounds[key] = result
+        if self.assets.finished:
+            print(f"Sounds loaded in {self.assets.elapsed * 1000:.0f} ms")
+            self.assets = None
 
     def play_sound(self, key):
         try:
@@ -266,47 +1047,90 @@ class Game:
                     except Exception as e:
                         print(f"Warning: failed to play bgm: {e}")
             else:
-                snd = self.sounds.get(key)
-                if snd:
-                    snd.play()
+                self.voices.play(key)
         except Exception:
             pass
         
+    def add_brick(self, brick):
+        self.brick_version += 1
+        brick.slot = len(self.bricks)
+        self.bricks.append(brick)
+        self.brick_grid.insert(brick)
+        if brick.cell >= 0:
+            self.brick_cells[brick.cell] = brick
+
+    def remove_brick(self, brick):
+        self.brick_version += 1
+        # Swap the last brick into the freed slot so removal is O(1)
+        last = self.bricks.pop()
+        if last is not brick:
+            last.slot = brick.slot
+            self.bricks[brick.slot] = last
+        brick.slot = -1
+        self.brick_grid.remove(brick)
+        if self.brick_cells.get(brick.cell) is brick:
+            del self.brick_cells[brick.cell]
+        if self.brick_field is not None:
+            self.brick_field.remove(brick)
+
+    def remove_bricks(self, bricks):
+        """remove_brick for many bricks at once, with one pass over self.bricks."""
+        if not bricks:
+            return
+        self.brick_version += 1
+        cells = self.brick_cells
+        for brick in bricks:
+            brick.slot = -1
+            if cells.get(brick.cell) is brick:
+                del cells[brick.cell]
+        if self.brick_field is not None:
+            for brick in bricks:
+                self.brick_field.remove(brick)
+        self.bricks[:] = [brick for brick in self.bricks if brick.slot != -1]
+        for slot, brick in enumerate(self.bricks):
+            brick.slot = slot
+        if len(bricks) > len(self.bricks):
+            # Fewer bricks are left than went: cheaper to build the grid again
+            self.brick_grid.clear()
+            for brick in self.bricks:
+                self.brick_grid.insert(brick)
+        else:
+            for brick in bricks:
+                self.brick_grid.remove(brick)
+
     def create_bricks(self):
         self.bricks = []
-        brick_start_y = 80
-        brick_gap = 5
-        
-        # Different layouts for different levels
-        if self.level == 1:
-            # Level 1: Basic layout
-            rows = 4
-            color_range = 4  # Only basic colors
-        elif self.level == 2:
-            # Level 2: More complex
-            rows = 5
-            color_range = 5  # Include silver bricks
-        else:
-            # Level 3: Most complex
-            rows = 6
-            color_range = 6  # Include gold bricks
-            
-        for row in range(rows):
-            for col in range(BRICK_COLS):
-                brick_x = col * (BRICK_WIDTH + brick_gap) + brick_gap
-                brick_y = row * (BRICK_HEIGHT + brick_gap) + brick_start_y
-                
-                # Assign colors based on row (basic) or random (advanced levels)
-                if self.level == 1:
-                    color_index = row % 4
-                else:
-                    color_index = random.randint(0, color_range - 1)
-                    
-                brick = Brick(brick_x, brick_y, color_index)
-                self.bricks.append(brick)
+        self.level_bricks = []
+        self.brick_grid.clear()
+        self.brick_cells.clear()
+        self.effects.clear()
+        self.layout_version += 1
+        self.renderer.invalidate()
+        if self.rewind is not None:
+            self.rewind.reset()
+        self.multiball = None
+        self.brick_field = None
+        self.total_bricks = 0
+        self.bricks_broken = 0
+        if self.endless is not None:
+            # Endless games stream their rows in as they scroll
+            self.endless.start()
+            return
+        # Lay out the bricks of the current level; random colours are picked now
+        level = self.levels.get(self.level)
+        for x, y, width, height, row, col, color, hits, low, high in (level.records if level else []):
+            if color < 0:
+                color = self.rng.randint(low, high)
+            brick = self.spawn_brick(x, y, color, hits, width, height, row, col)
+            brick.index = len(self.level_bricks)
+            self.level_bricks.append(brick)
                 
         self.total_bricks = len(self.bricks)
-        self.bricks_broken = 0
+
+    def spawn_brick(self, x, y, color, hits=None, width=BRICK_WIDTH, height=BRICK_HEIGHT, row=-1, col=-1):
+        brick = Brick(x, y, color, hits, width, height, row, col)
+        self.add_brick(brick)
+        return brick
         
     def handle_collisions(self):
         # Ball with walls
@@ -317,111 +1141,359 @@ class Game:
                 self.ball.rect.left = 1
             if self.ball.rect.right >= SCREEN_WIDTH:
                 self.ball.rect.right = SCREEN_WIDTH - 1
+            self.ball.sync()
                 
         if self.ball.rect.top <= 0:
             self.ball.dy *= -1
             self.ball.rect.top = 1
+            self.ball.sync()
             
         # Ball with paddle
         if self.ball.rect.colliderect(self.paddle.rect) and self.ball.dy > 0:
-            # Calculate hit position (from -1 to 1)
-            hit_pos = (self.ball.rect.centerx - self.paddle.rect.centerx) / (PADDLE_WIDTH / 2)
+            self.bounce_off_paddle()
             
-            # Adjust angle based on hit position
-            self.ball.dx = hit_pos * 6
-            self.ball.dy *= -1
+        # Ball with bricks: only bricks sharing a grid cell with the ball are tested
+        hits = [brick for brick in self.brick_grid.query(self.ball.rect)
+                if self.ball.rect.colliderect(brick.rect)]
+        if hits:
+            # Resolve against the top-left brick, as the row-by-row scan used to
+            brick = min(hits, key=lambda b: (b.rect.top, b.rect.left))
+            # Calculate collision side
+            dx1 = abs(self.ball.rect.right - brick.rect.left)
+            dx2 = abs(self.ball.rect.left - brick.rect.right)
+            dy1 = abs(self.ball.rect.bottom - brick.rect.top)
+            dy2 = abs(self.ball.rect.top - brick.rect.bottom)
             
-            # Increase speed every 5 paddle hits
-            self.ball.speed_increase_counter += 1
-            if self.ball.speed_increase_counter >= 5:
-                self.ball.increase_speed()
+            min_overlap = min(dx1, dx2, dy1, dy2)
             
-            # Move ball above paddle
-            self.ball.rect.bottom = self.paddle.rect.top - 1
-            # Play paddle sound
-            self.play_sound('paddle')
+            if min_overlap == dx1 or min_overlap == dx2:
+                self.ball.dx *= -1
+            else:
+                self.ball.dy *= -1
             
-        # Ball with bricks
-        for brick in self.bricks[:]:
-            if self.ball.rect.colliderect(brick.rect):
-                # Calculate collision side
-                dx1 = abs(self.ball.rect.right - brick.rect.left)
-                dx2 = abs(self.ball.rect.left - brick.rect.right)
-                dy1 = abs(self.ball.rect.bottom - brick.rect.top)
-                dy2 = abs(self.ball.rect.top - brick.rect.bottom)
-                
-                min_overlap = min(dx1, dx2, dy1, dy2)
-                
-                if min_overlap == dx1 or min_overlap == dx2:
-                    self.ball.dx *= -1
-                else:
-                    self.ball.dy *= -1
-                
-                # Handle brick hit
-                brick.hits += 1
-                if brick.hits >= brick.hits_required:
-                    self.score += brick.points
-                    self.bricks_broken += 1
-                    self.bricks.remove(brick)
-                    # Play brick hit sound
-                    self.play_sound('brick')
-                    
-                    # Check if level is complete
-                    if len(self.bricks) == 0:
-                        self.level_complete()
-                break
+            self.hit_brick(brick)
+        
+        self.check_ball_lost()
+
+    def bounce_off_paddle(self):
+        # Calculate hit position (from -1 to 1)
+        hit_pos = (self.ball.rect.centerx - self.paddle.rect.centerx) / (PADDLE_WIDTH / 2)
         
+        # Adjust angle based on hit position
+        self.ball.dx = hit_pos * 6
+        self.ball.dy *= -1
+        
+        # Increase speed every 5 paddle hits
+        self.ball.speed_increase_counter += 1
+        if self.ball.speed_increase_counter >= 5:
+            self.ball.increase_speed()
+        
+        # Move ball above paddle
+        self.ball.place(self.ball.x, self.paddle.rect.top - 1 - BALL_SIZE)
+        # Play paddle sound
+        self.play_sound('paddle')
+
+    def hit_brick(self, brick, damage=1):
+        self.brick_version += 1
+        if self.rewind is not None and self.endless is None:
+            self.rewind.note_hit(brick)
+        if self.broadcast is not None:
+            self.broadcast.note_hit(brick)
+        brick.hits += damage
+        self.renderer.invalidate(brick.rect)
+        if brick.hits >= brick.hits_required:
+            self.score += brick.points
+            self.bricks_broken += 1
+            self.remove_brick(brick)
+            if self.particles is not None:
+                self.particles.emit(brick.rect, brick.color_index)
+            # Play brick hit sound
+            self.play_sound('brick')
+            if brick.color_index == EXPLOSIVE:
+                self.detonate(brick)
+
+            # Check if level is complete (an endless field never is)
+            if len(self.bricks) == 0 and self.endless is None:
+                self.level_complete()
+
+    def detonate(self, brick):
+        """Damage the bricks around an exploded brick, and around those that explode in turn.
+
+        The whole chain resolves now, breadth first through brick_cells. Bricks
+        it destroys leave brick_cells at once, so nothing is hit twice, and the
+        other structures in one remove_bricks pass at the end; their bursts and
+        sounds are queued for the following ticks (see play_effects).
+        """
+        if brick.cell < 0:
+            return
+        cells = self.brick_cells
+        cell = cells.get
+        rewind = self.rewind if self.endless is None else None
+        broadcast = self.broadcast
+        effects = self.effects
+        destroyed = []
+        damaged = []
+        # One ring of the chain at a time: the bricks going off, and the bricks their blasts destroy
+        exploding = [brick]
+        ring = 1
+        while exploding:
+            wave = []
+            next_ring = []
+            for center in exploding:
+                key = center.cell
+                for offset in BLAST_OFFSETS:
+                    neighbour = cell(key + offset)
+                    if neighbour is None:
+                        continue
+                    if rewind is not None:
+                        rewind.note_hit(neighbour)
+                    if broadcast is not None:
+                        broadcast.note_hit(neighbour)
+                    neighbour.hits += 1
+                    if neighbour.hits < neighbour.hits_required:
+                        damaged.append(neighbour)
+                        continue
+                    del cells[neighbour.cell]
+                    wave.append(neighbour)
+                    if neighbour.color_index == EXPLOSIVE:
+                        next_ring.append(neighbour)
+            if wave:
+                # The wave's bursts wait until the blast would have got there
+                effects.append((self.effect_clock + ring * BLAST_WAVE_TICKS, wave))
+                destroyed += wave
+            exploding = next_ring
+            ring += 1
+        if not destroyed and not damaged:
+            return
+        self.brick_version += 1
+        self.score += sum(brick.points for brick in destroyed)
+        self.bricks_broken += len(destroyed)
+        self.remove_bricks(destroyed)
+        changed = destroyed + damaged
+        if len(changed) > DirtyRenderer.MAX_STALE:
+            self.renderer.invalidate()
+        else:
+            for hit in changed:
+                self.renderer.invalidate(hit.rect)
+
+    def play_effects(self):
+        """Start the bursts of chain-reaction bricks the blast has reached, a few per tick."""
+        effects = self.effects
+        started = 0
+        while effects and effects[0][0] <= self.effect_clock and started < EFFECTS_PER_TICK:
+            wave = effects[0][1]
+            brick = wave.pop()
+            if not wave:
+                effects.popleft()
+            if self.particles is not None:
+                self.particles.emit(brick.rect, brick.color_index, CHAIN_PARTICLES)
+            started += 1
+        if started:
+            self.play_sound('brick')
+
+    def update_ball(self):
+        if self.swept_collisions:
+            self.sweep_ball()
+            self.check_ball_lost()
+        else:
+            self.ball.move()
+            self.handle_collisions()
+
+    def sweep_ball(self):
+        """Move the ball through this step's whole path, resolving contacts in time order.
+
+        Each pass finds the earliest wall, paddle or brick contact along the rest of
+        the motion, moves the ball there, reflects it and carries on with the time
+        left, so fast balls cannot skip over thin bricks or the paddle.
+        """
+        ball = self.ball
+        # A paddle that moved into the ball still bounces it, as in handle_collisions
+        if ball.rect.colliderect(self.paddle.rect) and ball.dy > 0:
+            self.bounce_off_paddle()
+
+        remaining = 1.0
+        for _ in range(MAX_CONTACTS_PER_STEP):
+            dx = ball.dx * remaining
+            dy = ball.dy * remaining
+            contacts = []
+
+            # Walls
+            if dx < 0:
+                contacts.append((max(0.0, -ball.x / dx), 'x', None))
+            elif dx > 0:
+                contacts.append((max(0.0, (SCREEN_WIDTH - BALL_SIZE - ball.x) / dx), 'x', None))
+            if dy < 0:
+                contacts.append((max(0.0, -ball.y / dy), 'y', None))
+
+            # Paddle, only from above
+            if dy > 0:
+                hit = sweep_aabb(ball.x, ball.y, BALL_SIZE, BALL_SIZE, dx, dy, self.paddle.rect)
+                if hit:
+                    contacts.append((hit[0], hit[1], self.paddle))
+
+            # Bricks in the cells covered by the swept box
+            sweep = pygame.Rect(int(min(ball.x, ball.x + dx)) - 1, int(min(ball.y, ball.y + dy)) - 1,
+                                int(abs(dx)) + BALL_SIZE + 3, int(abs(dy)) + BALL_SIZE + 3)
+            for brick in self.brick_grid.query(sweep):
+                hit = sweep_aabb(ball.x, ball.y, BALL_SIZE, BALL_SIZE, dx, dy, brick.rect)
+                if hit:
+                    contacts.append((hit[0], hit[1], brick))
+
+            contacts = [c for c in contacts if c[0] <= 1.0]
+            if not contacts:
+                ball.place(ball.x + dx, ball.y + dy)
+                break
+
+            t = min(c[0] for c in contacts)
+            ball.place(ball.x + dx * t, ball.y + dy * t)
+            remaining *= 1.0 - t
+
+            # Resolve every contact at this instant, flipping each axis at most once
+            flip_x = flip_y = False
+            for contact_t, axis, target in contacts:
+                if contact_t > t + 1e-9:
+                    continue
+                if target is self.paddle:
+                    self.bounce_off_paddle()
+                    continue
+                if 'x' in axis:
+                    flip_x = True
+                if 'y' in axis:
+                    flip_y = True
+                # A brick hit at this same instant may already have been blown up
+                if target is not None and target.slot != -1:
+                    self.hit_brick(target)
+            if flip_x:
+                ball.dx *= -1
+            if flip_y:
+                ball.dy *= -1
+
+            if self.state != STATE_PLAYING or remaining <= 0:
+                break
+
+    def start_multiball(self, count=MULTIBALL_COUNT):
+        """Release `count` extra balls from the ball, fanned out upwards."""
+        if multiball is None:
+            print('Warning: multi-ball needs numpy; ignoring.')
+            return
+        if self.multiball is None:
+            self.multiball = multiball.BallSystem(MULTIBALL_CAPACITY, BALL_SIZE)
+            self.rebuild_brick_field()
+        speed = sqrt(self.ball.dx ** 2 + self.ball.dy ** 2)
+        angles = [pi * (0.2 + 0.6 * (i + 0.5) / count) for i in range(count)]
+        self.multiball.spawn(self.ball.x, self.ball.y,
+                             [speed * cos(a) for a in angles], [-speed * sin(a) for a in angles])
+
+    def rebuild_brick_field(self):
+        # The extra balls collide with the bricks as arrays, rebuilt when bricks move
+        self.brick_field = multiball.BrickField(self.bricks, self.brick_grid.cell_width,
+                                                self.brick_grid.cell_height)
+
+    def update_multiball(self):
+        bricks, hits, paddle_hits, lost = self.multiball.step(self.brick_field, self.paddle.rect,
+                                                              SCREEN_WIDTH, SCREEN_HEIGHT)
+        for index, damage in zip(bricks.tolist(), hits.tolist()):
+            brick = self.brick_field.bricks[index]
+            # The main ball may already have destroyed it this tick
+            if brick.slot != -1:
+                self.hit_brick(brick, damage)
+            if self.state != STATE_PLAYING:
+                return
+        if paddle_hits:
+            self.play_sound('paddle')
+        # Extra balls that fall out are simply gone; they never cost a life
+        if self.multiball.count == 0:
+            self.multiball = None
+            self.brick_field = None
+
+    def draw_multiball(self, surface):
+        if self.multiball is None:
+            return []
+        sprite = get_ball_sprite()
+        positions = self.multiball.pos[:self.multiball.count].round().astype(int).tolist()
+        return surface.blits([(sprite, pos) for pos in positions])
+
+    def draw_particles(self, surface):
+        if self.particles is None:
+            return []
+        return self.particles.draw(surface)
+
+    def check_ball_lost(self):
         # Ball falling below paddle
         if self.ball.rect.top > SCREEN_HEIGHT:
             self.lives -= 1
             if self.lives <= 0:
-                self.state = STATE_GAME_OVER
-                self.create_game_over_buttons()
+                self.game_over()
             else:
                 # Reset ball position
                 self.ball.rect.centerx = self.paddle.rect.centerx
                 self.ball.rect.bottom = self.paddle.rect.top - 10
-                self.ball.dx = random.choice([-4, -3, 3, 4])
+                self.ball.sync()
+                self.ball.snap()
+                self.ball.dx = self.rng.choice([-4, -3, 3, 4])
                 self.ball.dy = -4
                 self.ball.speed_increase_counter = 0
                 # Play life lost sound
                 self.play_sound('life')
                 
+    def breach(self):
+        # An endless row reached the danger line with bricks still standing
+        self.lives -= 1
+        self.play_sound('life')
+        if self.lives <= 0:
+            self.game_over()
+
     def level_complete(self):
         # Add bonus points for completing level
         self.score += 100
         # Play level complete sound (if available)
         self.play_sound('level')
         self.state = STATE_LEVEL_COMPLETE
+        # Have the next level ready by the time the player moves on
+        self.levels.prefetch(self.level + 1)
         
+    def game_over(self):
+        self.state = STATE_GAME_OVER
+        self.create_game_over_buttons()
+        # A game rewound out of its game over and ended again is still one game;
+        # endless games are not ranked against the campaign
+        if self.high_scores is None or self.session_recorded or self.endless is not None:
+            return
+        self.session_recorded = True
+        won = self.level > self.levels.count
+        seconds = self.recorder.ticks / TICK_RATE if self.recorder is not None else 0.0
+        self.score_ticket = self.high_scores.record(self.score, min(self.level, self.levels.count), won,
+                                                    self.seed, seconds)
+
     def next_level(self):
         self.level += 1
-        if self.level > 3:
+        if self.level > self.levels.count:
             # Game won
-            self.state = STATE_GAME_OVER
-            self.create_game_over_buttons()
+            self.game_over()
         else:
             self.reset_level()
             self.state = STATE_PLAYING
             
-    def draw_hud(self):
+    def draw_hud(self, surface=None):
+        surface = surface or self.screen
         font = safe_font('Arial', 24, bold=True)
         
         # Score
-        score_text = font.render(f"Score: {self.score}", True, TEXT_COLOR)
-        self.screen.blit(score_text, (10, 10))
+        score_text = render_text(font, f"Score: {self.score}", TEXT_COLOR)
+        surface.blit(score_text, (10, 10))
         
         # Lives
-        lives_text = font.render(f"Lives: {self.lives}", True, TEXT_COLOR)
-        self.screen.blit(lives_text, (SCREEN_WIDTH - 100, 10))
+        lives_text = render_text(font, f"Lives: {self.lives}", TEXT_COLOR)
+        surface.blit(lives_text, (SCREEN_WIDTH - 100, 10))
         
         # Level
-        level_text = font.render(f"Level: {self.level}/3", True, TEXT_COLOR)
-        self.screen.blit(level_text, (SCREEN_WIDTH // 2 - 40, 10))
+        level = f"Level: {self.level}" if self.endless is not None else f"Level: {self.level}/{self.levels.count}"
+        level_text = render_text(font, level, TEXT_COLOR)
+        surface.blit(level_text, (SCREEN_WIDTH // 2 - 40, 10))
         
         # Bricks remaining
-        bricks_text = font.render(f"Bricks: {self.total_bricks - self.bricks_broken}/{self.total_bricks}", True, TEXT_COLOR)
-        self.screen.blit(bricks_text, (10, 40))
+        bricks_text = render_text(font, f"Bricks: {self.total_bricks - self.bricks_broken}/{self.total_bricks}", TEXT_COLOR)
+        surface.blit(bricks_text, (10, 40))
         
     def draw_menu(self):
         # Draw background
@@ -429,9 +1501,9 @@ class Game:
         
         # Draw title
         title_font = safe_font('Arial', 64, bold=True)
-        title = title_font.render("CASTLE DEFENDER", True, (255, 215, 0))
+        title = render_text(title_font, "CASTLE DEFENDER", (255, 215, 0))
         subtitle_font = safe_font('Arial', 32)
-        subtitle = subtitle_font.render("Brick Breaker", True, (200, 200, 255))
+        subtitle = render_text(subtitle_font, "Brick Breaker", (200, 200, 255))
         
         self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 100))
         self.screen.blit(subtitle, (SCREEN_WIDTH//2 - subtitle.get_width()//2, 170))
@@ -440,16 +1512,29 @@ class Game:
         for button in self.buttons:
             button.draw(self.screen)
             
+        # Sound loading progress while assets are still decoding
+        if self.assets is not None:
+            bar = pygame.Rect(SCREEN_WIDTH//2 - 100, 490, 200, 8)
+            pygame.draw.rect(self.screen, (60, 50, 90), bar, border_radius=4)
+            pygame.draw.rect(self.screen, BUTTON_HOVER, (bar.x, bar.y, int(bar.width * self.assets.progress), bar.height),
+                             border_radius=4)
+            loading_font = safe_font('Arial', 18)
+            loading = render_text(loading_font, f"Loading sounds {self.assets.done}/{self.assets.total}", (150, 150, 200))
+            self.screen.blit(loading, (SCREEN_WIDTH//2 - loading.get_width()//2, 505))
+            
         # Draw instructions at bottom
         instr_font = safe_font('Arial', 18)
-        instr = instr_font.render("Use LEFT/RIGHT arrows to move, SPACE to launch/pause, ESC for menu", True, (150, 150, 200))
+        instr = render_text(instr_font, "Use LEFT/RIGHT arrows to move, SPACE to launch/pause, ESC for menu", (150, 150, 200))
         self.screen.blit(instr, (SCREEN_WIDTH//2 - instr.get_width()//2, SCREEN_HEIGHT - 30))
+        keys = render_text(instr_font, "Hold R to rewind, M multi-ball (Shift+M: hundreds), F2 renderer, F3 timings, "
+                                       "F5 autopilot, F8 capture, F9 save replay, F11 fullscreen", (150, 150, 200))
+        self.screen.blit(keys, (SCREEN_WIDTH//2 - keys.get_width()//2, SCREEN_HEIGHT - 54))
         
     def draw_instructions(self):
         self.screen.fill(BACKGROUND)
         
         title_font = safe_font('Arial', 48, bold=True)
-        title = title_font.render("INSTRUCTIONS", True, (255, 215, 0))
+        title = render_text(title_font, "INSTRUCTIONS", (255, 215, 0))
         self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 50))
         
         font = safe_font('Arial', 24)
@@ -468,24 +1553,25 @@ class Game:
             "- Yellow Bricks: 40 points",
             "- Silver Bricks: 50 points (requires 2 hits)",
             "- Gold Bricks: 100 points",
+            "- Explosive Bricks: 70 points, and they blast the bricks around them",
             "- Level Complete: 100 bonus points",
             "",
             "WIN CONDITION:",
-            "- Clear all 3 levels to restore the castle!",
+            f"- Clear all {self.levels.count} levels to restore the castle!",
             "",
             "Press ESC to return to main menu"
         ]
         
         y_offset = 120
         for line in lines:
-            text = font.render(line, True, TEXT_COLOR)
+            text = render_text(font, line, TEXT_COLOR)
             self.screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, y_offset))
             y_offset += 30
             
     def draw_game_over(self):
         self.screen.fill(BACKGROUND)
 
-        if self.level > 3:
+        if self.endless is None and self.level > self.levels.count:
             title = "CASTLE RESTORED!"
             message = f"Final Score: {self.score}"
             color = (50, 255, 50)
@@ -496,12 +1582,12 @@ class Game:
             color = (255, 50, 50)
 
         title_font = safe_font('Ariel', 64, bold=True)
-        title_text = title_font.render(title, True, color)
+        title_text = render_text(title_font, title, color)
         self.screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, 120))
 
         # Draw score
         font = safe_font('Arial', 36)
-        score_text = font.render(message, True, TEXT_COLOR)
+        score_text = render_text(font, message, TEXT_COLOR)
         self.screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, 210))
 
             # Draw buttons FIRST
@@ -509,46 +1595,82 @@ class Game:
             button.draw(self.screen)
 
         # Draw level reached AFTER buttons
-        level_text = font.render(f"Level Reached: {self.level}/3", True, TEXT_COLOR)
+        if self.endless is not None:
+            reached = f"Rows Survived: {self.endless.rows_released}"
+        else:
+            reached = f"Level Reached: {self.level}/{self.levels.count}"
+        level_text = render_text(font, reached, TEXT_COLOR)
         self.screen.blit(
             level_text,
             (SCREEN_WIDTH // 2 - level_text.get_width() // 2, 460)
         )
 
+        if self.high_scores is not None and self.endless is None:
+            self.draw_high_scores()
+
+    def draw_high_scores(self):
+        # Top scores down the left, this game's rank and the level's record below the level line
+        font = safe_font('Arial', 20)
+        heading = render_text(font, "High Scores", (200, 200, 255))
+        self.screen.blit(heading, (40, 250))
+        if not self.high_scores.ready.is_set():
+            self.screen.blit(render_text(font, "Loading...", TEXT_COLOR), (40, 280))
+            return
+        new_rank = self.high_scores.rank(self.score_ticket)
+        for i, (score, level, won, end_time, seconds) in enumerate(self.high_scores.table()[:8]):
+            color = BALL_COLOR if i + 1 == new_rank else TEXT_COLOR
+            line = render_text(font, f"{i + 1}. {score}  L{level}{'*' if won else ''}", color)
+            self.screen.blit(line, (40, 280 + i * 24))
+
+        level = min(self.level, self.levels.count)
+        reached, cleared, ended, best = self.high_scores.level_stats(level)
+        lines = [f"Level {level}: reached {reached} times, cleared {cleared}, best score {best}"]
+        if new_rank is not None:
+            lines.insert(0, f"New high score! Rank {new_rank}")
+        for i, line in enumerate(lines):
+            text = render_text(font, line, BALL_COLOR if i == 0 and new_rank else TEXT_COLOR)
+            self.screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 510 + i * 26))
+
             
     def draw_level_complete(self):
         self.screen.fill(BACKGROUND)
         
         title_font = safe_font('Arial', 64, bold=True)
-        title = title_font.render("LEVEL COMPLETE!", True, (50, 255, 150))
+        title = render_text(title_font, "LEVEL COMPLETE!", (50, 255, 150))
         self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 150))
         
         font = safe_font('Arial', 36)
-        score_text = font.render(f"Score: {self.score}", True, TEXT_COLOR)
+        score_text = render_text(font, f"Score: {self.score}", TEXT_COLOR)
         self.screen.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 250))
         
-        next_level_text = font.render(f"Next Level: {self.level + 1}/3", True, TEXT_COLOR)
+        next_level_text = render_text(font, f"Next Level: {self.level + 1}/{self.levels.count}", TEXT_COLOR)
         self.screen.blit(next_level_text, (SCREEN_WIDTH//2 - next_level_text.get_width()//2, 300))
         
         # Draw continue prompt
         prompt_font = safe_font('Arial', 24)
-        prompt = prompt_font.render("Press SPACE to continue to next level", True, (200, 200, 255))
+        prompt = render_text(prompt_font, "Press SPACE to continue to next level", (200, 200, 255))
         self.screen.blit(prompt, (SCREEN_WIDTH//2 - prompt.get_width()//2, 400))
         
-    def draw_game(self):
+    def draw_bricks(self, surface):
+        # The whole brick field as one batched blit from the brick atlases
+        surface.blits([(brick.atlas.surface, brick.rect, brick.sprite_area()) for brick in self.bricks],
+                      doreturn=False)
+
+    def draw_game(self, alpha=1.0):
         # Draw background
         self.screen.fill(BACKGROUND)
         
         # Draw bricks
-        for brick in self.bricks:
-            brick.draw(self.screen)
+        self.draw_bricks(self.screen)
             
-        # Draw paddle and ball
-        self.paddle.draw(self.screen)
-        self.ball.draw(self.screen)
-        
-        # Draw HUD
+        # Draw HUD (under the ball, as the dirty-rect renderer keeps it on its background layer)
         self.draw_hud()
+            
+        # Draw paddle and ball, interpolated between the last two physics ticks
+        self.paddle.draw(self.screen, alpha)
+        self.ball.draw(self.screen, alpha)
+        self.draw_multiball(self.screen)
+        self.draw_particles(self.screen)
         
         # Draw pause indicator if paused
         if self.state == STATE_PAUSED:
@@ -557,37 +1679,149 @@ class Game:
             self.screen.blit(overlay, (0, 0))
             
             font = safe_font('Arial', 72, bold=True)
-            pause_text = font.render("PAUSED", True, (255, 215, 0))
+            pause_text = render_text(font, "PAUSED", (255, 215, 0))
             self.screen.blit(pause_text, (SCREEN_WIDTH//2 - pause_text.get_width()//2, SCREEN_HEIGHT//2 - 50))
             
             small_font = safe_font('Arial', 24)
-            continue_text = small_font.render("Press SPACE to continue", True, TEXT_COLOR)
+            continue_text = render_text(small_font, "Press SPACE to continue", TEXT_COLOR)
             self.screen.blit(continue_text, (SCREEN_WIDTH//2 - continue_text.get_width()//2, SCREEN_HEIGHT//2 + 50))
             
+    def press_space(self):
+        if self.state == STATE_READY:
+            # launch ball
+            self.state = STATE_PLAYING
+        elif self.state == STATE_PLAYING:
+            self.state = STATE_PAUSED
+        elif self.state == STATE_PAUSED:
+            self.state = STATE_PLAYING
+        elif self.state == STATE_LEVEL_COMPLETE:
+            self.next_level()
+
+    def tick(self, left=False, right=False, space=False):
+        """Advance the simulation by one fixed physics tick (TICK_TIME seconds)."""
+        inputs = ((replay.INPUT_LEFT if left else 0) | (replay.INPUT_RIGHT if right else 0) |
+                  (replay.INPUT_SPACE if space else 0))
+        self.tick_input(inputs)
+
+    def tick_input(self, inputs):
+        """One physics tick driven by a replay.INPUT_* bit mask.
+
+        Everything that changes the simulation goes through here, which is what
+        makes recorded inputs replay exactly.
+        """
+        if self.recorder is not None and self.state not in (STATE_MENU, STATE_INSTRUCTIONS):
+            self.recorder.record(inputs)
+        if inputs & replay.INPUT_SPACE:
+            self.press_space()
+        if self.state == STATE_PLAYING:
+            if inputs & replay.INPUT_MULTIBALL:
+                self.start_multiball()
+            if inputs & replay.INPUT_STRESS:
+                self.start_multiball(MULTIBALL_STRESS_COUNT)
+        left = inputs & replay.INPUT_LEFT
+        right = inputs & replay.INPUT_RIGHT
+
+        self.paddle.prev_x = self.paddle.rect.x
+        self.ball.snap()
+
+        # Allow paddle movement in PLAYING and READY states
+        if self.state in (STATE_PLAYING, STATE_READY):
+            if left:
+                self.paddle.move("left", SCREEN_WIDTH)
+            if right:
+                self.paddle.move("right", SCREEN_WIDTH)
+
+        # When playing, update ball and collisions. When ready, keep ball on paddle.
+        if self.state == STATE_PLAYING:
+            # Move the ball and handle its collisions
+            self.update_ball()
+            if self.multiball is not None and self.state == STATE_PLAYING:
+                self.update_multiball()
+            if self.endless is not None and self.state == STATE_PLAYING:
+                self.endless.update()
+        elif self.state == STATE_READY:
+            # keep ball positioned on paddle until player launches
+            self.ball.rect.centerx = self.paddle.rect.centerx
+            self.ball.rect.bottom = self.paddle.rect.top - 10
+            self.ball.sync()
+        if self.state != STATE_PAUSED:
+            self.effect_clock += 1
+            if self.effects:
+                self.play_effects()
+            if self.particles is not None:
+                self.particles.update()
+        # Rewinds do not cover endless games, whose rows come and go
+        if self.rewind is not None and self.endless is None and self.state not in (STATE_MENU, STATE_INSTRUCTIONS):
+            self.rewind.capture(self)
+        if self.broadcast is not None:
+            self.broadcast.feed(self)
+
+    def start_broadcast(self, port=spectator.SPECTATOR_PORT):
+        server = spectator.BroadcastServer(port=port)
+        try:
+            server.start()
+        except OSError as e:
+            print(f"Warning: could not accept spectators on port {port}: {e}")
+            return
+        self.broadcast = server
+        print(f"Spectators can watch on port {server.port}")
+
+    def stop_broadcast(self):
+        if self.broadcast is not None:
+            self.broadcast.close()
+            print(f"Spectators: {self.broadcast.summary()}")
+            self.broadcast = None
+
+    def start_capture(self, out_dir=None, file_format='png', scale=CAPTURE_SCALE):
+        out_dir = out_dir or os.path.join(CAPTURE_DIR, time.strftime('capture_%Y%m%d_%H%M%S'))
+        try:
+            self.capture = capture.FrameCapture(out_dir, self.screen.get_size(), file_format, scale)
+        except OSError as e:
+            print(f"Warning: could not start frame capture: {e}")
+            return
+        print(f"Capturing frames to {out_dir}")
+
+    def stop_capture(self):
+        if self.capture is not None:
+            print(f"Capture: {self.capture.close()}")
+            self.capture = None
+
+    def toggle_fullscreen(self):
+        self.fullscreen = not self.fullscreen
+        if self.fullscreen:
+            self.window = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            self.window = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
+        self.presenter.resize(self.window)
+
     def run(self):
         running = True
+        # Simulation time owed to the physics; drained in fixed TICK_TIME steps
+        accumulator = 0.0
+        # Key presses that affect the simulation wait here for the next tick
+        pending_input = 0
+        timer = self.frame_timer
+        self.clock.tick()
+        timer.last = time.perf_counter()
         
         while running:
-            mouse_pos = pygame.mouse.get_pos()
+            # Real time since the last frame, capped so a long stall cannot
+            # queue up an unbounded number of catch-up ticks
+            accumulator += min(self.clock.tick(FPS) / 1000.0, MAX_FRAME_TIME)
+            timer.mark('wait')
+            mouse_pos = self.presenter.to_logical(pygame.mouse.get_pos())
+            if self.assets is not None:
+                self.update_assets()
             
             # Event handling
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
 
-                # Handle window resize so layout stays usable when maximized
-                if event.type == pygame.VIDEORESIZE:
-                    new_w, new_h = event.w, event.h
-                    # Update screen surface and globals used for layout
-                    self.screen = pygame.display.set_mode((new_w, new_h), pygame.RESIZABLE)
-                    # Update module-level width/height so drawing uses new dimensions
-                    global SCREEN_WIDTH, SCREEN_HEIGHT
-                    SCREEN_WIDTH = new_w
-                    SCREEN_HEIGHT = new_h
-                    # Ensure paddle remains inside new bounds
-                    if self.paddle:
-                        if self.paddle.rect.right > SCREEN_WIDTH:
-                            self.paddle.rect.right = SCREEN_WIDTH - 1
+                # A resized window only changes how the screen is scaled, never the layout
+                if event.type == pygame.VIDEORESIZE and not self.fullscreen:
+                    self.window = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
+                    self.presenter.resize(self.window)
                     
                 # Handle buttons based on game state
                 if self.state in [STATE_MENU, STATE_GAME_OVER]:
@@ -601,12 +1835,15 @@ class Game:
                                 self.reset_game()
                                 # go to ready state so player can press SPACE to launch
                                 self.state = STATE_READY
+                            elif action == "endless":
+                                self.reset_game(endless_mode=True)
+                                self.state = STATE_READY
                             elif action == "instructions":
                                 self.state = STATE_INSTRUCTIONS
                             elif action == "quit":
                                 running = False
                             elif action == "restart":
-                                self.reset_game()
+                                self.reset_game(endless_mode=self.endless is not None)
                                 self.state = STATE_READY
                             elif action == "menu":
                                 self.state = STATE_MENU
@@ -621,40 +1858,82 @@ class Game:
                         elif self.state == STATE_INSTRUCTIONS:
                             self.state = STATE_MENU
                             
+                    if event.key == pygame.K_m and self.state == STATE_PLAYING:
+                        # Multi-ball power-up; with Shift, a stress test with hundreds of balls
+                        if event.mod & pygame.KMOD_SHIFT:
+                            pending_input |= replay.INPUT_STRESS
+                        else:
+                            pending_input |= replay.INPUT_MULTIBALL
+
+                    if event.key == pygame.K_F9 and self.recorder is not None:
+                        # Save this session as a replay, e.g. to attach to a bug report
+                        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replays',
+                                            time.strftime('replay_%Y%m%d_%H%M%S.bbr'))
+                        self.recorder.save(path, self)
+                        print(f"Replay saved to {path}")
+
+                    if event.key == pygame.K_F2:
+                        # Switch between dirty-rect and full redraws, e.g. to compare them
+                        self.render_mode = 'full' if self.render_mode == 'dirty' else 'dirty'
+                        self.renderer.invalidate_screen()
+
+                    if event.key == pygame.K_F5:
+                        # Autopilot for demos and soak tests
+                        self.autopilot = None if self.autopilot is not None else Autopilot()
+
+                    if event.key == pygame.K_F11:
+                        self.toggle_fullscreen()
+
+                    if event.key == pygame.K_F8:
+                        # Start or stop capturing frames
+                        if self.capture is None:
+                            self.start_capture()
+                        else:
+                            self.stop_capture()
+
+                    if event.key == pygame.K_F3:
+                        # Frame timing overlay
+                        timer.toggle()
+
                     if event.key == pygame.K_SPACE:
-                        if self.state == STATE_READY:
-                            # launch ball
-                            self.state = STATE_PLAYING
-                        elif self.state == STATE_PLAYING:
-                            self.state = STATE_PAUSED
-                        elif self.state == STATE_PAUSED:
-                            self.state = STATE_PLAYING
-                        elif self.state == STATE_LEVEL_COMPLETE:
-                            self.next_level()
+                        pending_input |= replay.INPUT_SPACE
                             
-            # Game state updates
-            # Allow paddle movement in PLAYING and READY states
-            if self.state in (STATE_PLAYING, STATE_READY):
-                keys = pygame.key.get_pressed()
-                if keys[pygame.K_LEFT]:
-                    self.paddle.move("left", SCREEN_WIDTH)
-                if keys[pygame.K_RIGHT]:
-                    self.paddle.move("right", SCREEN_WIDTH)
-
-            # When playing, update ball and collisions. When ready, keep ball on paddle.
-            if self.state == STATE_PLAYING:
-                # Update ball position
-                self.ball.move()
-
-                # Handle collisions
-                self.handle_collisions()
-            elif self.state == STATE_READY:
-                # keep ball positioned on paddle until player launches
-                self.ball.rect.centerx = self.paddle.rect.centerx
-                self.ball.rect.bottom = self.paddle.rect.top - 10
+            timer.mark('events')
+
+            # Game state updates: run as many fixed ticks as real time has passed
+            keys = pygame.key.get_pressed()
+            held = ((replay.INPUT_LEFT if keys[pygame.K_LEFT] else 0) |
+                    (replay.INPUT_RIGHT if keys[pygame.K_RIGHT] else 0))
+            rewinding = (keys[pygame.K_r] and self.rewind is not None and self.endless is None and
+                         self.state not in (STATE_MENU, STATE_INSTRUCTIONS))
+            while accumulator >= TICK_TIME:
+                if rewinding:
+                    # Holding R runs time backwards, one tick per tick
+                    self.rewind.step_back(self)
+                    if self.broadcast is not None:
+                        self.broadcast.feed(self)
+                    accumulator -= TICK_TIME
+                    continue
+                if self.autopilot is not None:
+                    # The autopilot's moves go through the normal input, so replays include them
+                    left, right = self.autopilot(self)
+                    held = (replay.INPUT_LEFT if left else 0) | (replay.INPUT_RIGHT if right else 0)
+                self.tick_input(held | pending_input)
+                pending_input = 0
+                accumulator -= TICK_TIME
+            # How far the display is between the last tick and the next one
+            alpha = accumulator / TICK_TIME
+            timer.mark('update')
                 
             # Drawing based on game state
-            if self.state == STATE_MENU:
+            dirty_rects = None
+            use_dirty = self.render_mode == 'dirty' and self.state in (STATE_PLAYING, STATE_READY)
+            if not use_dirty:
+                self.renderer.invalidate_screen()
+            if use_dirty:
+                # Only what changed is redrawn; None means the whole screen was
+                dirty_rects = self.renderer.draw(self, alpha)
+            elif self.state == STATE_MENU:
                 self.draw_menu()
             elif self.state == STATE_INSTRUCTIONS:
                 self.draw_instructions()
@@ -663,7 +1942,16 @@ class Game:
             elif self.state == STATE_LEVEL_COMPLETE:
                 self.draw_level_complete()
             else:  # PLAYING or PAUSED
-                self.draw_game()
+                self.draw_game(alpha)
+
+            if timer.visible and timer.stats is not None:
+                overlay = timer.draw(self.screen)
+                if use_dirty:
+                    # The renderer restores the overlay area like a moving sprite
+                    self.renderer.moving_rects.append(overlay)
+                if dirty_rects is not None:
+                    dirty_rects.append(overlay)
+            timer.mark('draw')
 
             # Background music: play when in PLAYING, stop otherwise
             try:
@@ -677,12 +1965,42 @@ class Game:
                 pass
 
             # Update display
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            self.presenter.present(self.screen, dirty_rects)
+            if self.capture is not None:
+                self.capture.capture(self.screen)
+            timer.mark('present')
+            timer.end_frame()
+            if self.time_to_first_frame is None:
+                self.time_to_first_frame = time.perf_counter() - START_TIME
+                print(f"First frame after {self.time_to_first_frame * 1000:.0f} ms")
             
+        timer.close()
+        self.stop_capture()
+        self.stop_broadcast()
+        if self.high_scores is not None:
+            self.high_scores.close()
+        if self.voices.triggers:
+            print(f"Audio: {self.voices.summary()}")
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Brick Breaker')
+    parser.add_argument('--timings-csv', metavar='PATH', help='write per-frame phase timings (ms) to a CSV file')
+    parser.add_argument('--capture', metavar='DIR', help='capture every presented frame into DIR')
+    parser.add_argument('--capture-format', choices=capture.CAPTURE_FORMATS, default='png',
+                        help='a PNG per frame, or one raw RGB file (default: png)')
+    parser.add_argument('--capture-scale', type=int, default=1, metavar='N', help='shrink captured frames N times')
+    parser.add_argument('--spectators', type=int, nargs='?', const=spectator.SPECTATOR_PORT, metavar='PORT',
+                        help=f'let spectators watch over the network (default port: {spectator.SPECTATOR_PORT})')
+    args = parser.parse_args()
     game = Game()
+    if args.timings_csv:
+        game.frame_timer.start_csv(args.timings_csv)
+    if args.capture:
+        game.start_capture(args.capture, args.capture_format, args.capture_scale)
+    if args.spectators is not None:
+        game.start_broadcast(args.spectators)
     game.run()
\ No newline at end of file
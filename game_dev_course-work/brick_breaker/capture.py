@@ -0,0 +1,198 @@
+"""Gameplay frame capture that never stalls the game loop.
+
+FrameCapture copies each presented frame into a slot of a preallocated
+shared-memory ring (one memcpy straight from the surface's pixel buffer) and
+sends the slot number down a pipe to a writer process. The writer saves frames
+as a PNG sequence or appends them to one raw RGB file, scaled down by an
+optional integer factor, and sends the slot number back when it is free
+again. When every slot is still waiting for the writer the frame is dropped,
+so the game never waits on the encoder or the disk.
+
+The writer is this file run as a script in a fresh interpreter. A forked
+copy of the game would inherit its SDL, audio and threads, and a
+multiprocessing spawn would import (and so initialise) the whole game again.
+
+Raw captures are one file, frames.raw, of width * height * 3 bytes per frame,
+described by frames.json (size, frame count and numbers of the frames kept).
+"""
+import os
+import sys
+import json
+import time
+import signal
+import struct
+import subprocess
+from multiprocessing import shared_memory, resource_tracker
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame
+
+# Frames the ring holds, i.e. how far the writer may fall behind before frames are dropped
+CAPTURE_SLOTS = 16
+CAPTURE_FORMATS = ('png', 'raw')
+
+# Game -> writer: slot, frame number (slot -1 = stop); writer -> game: freed slot
+JOB = struct.Struct('<ii')
+DONE = struct.Struct('<i')
+
+
+def pixel_format(surface):
+    """pygame.image.frombuffer format of the surface's pixel buffer, or None if it has no usable one."""
+    if surface.get_bitsize() != 32 or surface.get_pitch() != surface.get_width() * 4:
+        return None
+    # Position in memory of each 32-bit channel mask on a little-endian machine
+    if sys.byteorder != 'little':
+        return None
+    position = {0xFF: 0, 0xFF00: 1, 0xFF0000: 2, 0xFF000000: 3}
+    r, g, b, a = surface.get_masks()
+    if r not in position or g not in position or b not in position:
+        return None
+    order = ['X'] * 4
+    order[position[r]], order[position[g]], order[position[b]] = 'R', 'G', 'B'
+    # frombuffer has no BGRX or XRGB, so those read their padding byte as alpha:
+    # write_frames makes every frame opaque before saving it
+    return {'RGBX': 'RGBX', 'RGBA': 'RGBX', 'BGRX': 'BGRA', 'BGRA': 'BGRA',
+            'XRGB': 'ARGB', 'ARGB': 'ARGB'}.get(''.join(order))
+
+
+class FrameCapture:
+    """Captures frames of `size` to `out_dir` as 'png' or 'raw', shrunk `scale` times each way."""
+    def __init__(self, out_dir, size, file_format='png', scale=1, slots=CAPTURE_SLOTS):
+        if file_format not in CAPTURE_FORMATS:
+            raise ValueError(f'unknown capture format {file_format!r}')
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.size = size
+        self.file_format = file_format
+        self.scale = max(1, scale)
+        self.slot_bytes = size[0] * size[1] * 4
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_bytes)
+        self.free = list(range(slots))
+        self.pending = b''
+        self.fmt = None
+        self.process = None
+        self.frames = self.dropped = self.written = 0
+        self.copy_time = 0.0
+
+    def start(self, fmt):
+        self.fmt = fmt
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), self.shm.name, str(self.slot_bytes), str(self.size[0]),
+             str(self.size[1]), fmt, self.out_dir, self.file_format, str(self.scale)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        os.set_blocking(self.process.stdout.fileno(), False)
+
+    def capture(self, surface):
+        """Queue `surface` (the logical screen) for writing; returns False if it was dropped."""
+        start = time.perf_counter()
+        self.frames += 1
+        self.collect()
+        if not self.free:
+            self.dropped += 1
+            return False
+        fmt = pixel_format(surface)
+        if self.process is None:
+            # The writer needs the pixel format, which is only known once there is a frame
+            self.start(fmt or 'RGBX')
+        slot = self.free.pop()
+        target = self.shm.buf[slot * self.slot_bytes:(slot + 1) * self.slot_bytes]
+        if fmt == self.fmt:
+            # Straight from the surface's pixels into the ring
+            target[:] = memoryview(surface.get_view('1')).cast('B')
+        else:
+            target[:] = pygame.image.tobytes(surface, 'RGBX')
+        del target
+        # At most one job per slot is in flight, so this never fills the pipe
+        self.process.stdin.write(JOB.pack(slot, self.frames))
+        self.process.stdin.flush()
+        self.copy_time += time.perf_counter() - start
+        return True
+
+    def collect(self, data=None):
+        """Take back the slots the writer has finished with."""
+        if data is None:
+            try:
+                data = os.read(self.process.stdout.fileno(), 4096) if self.process else b''
+            except BlockingIOError:
+                return
+        data = self.pending + data
+        end = len(data) - len(data) % DONE.size
+        for (slot,) in DONE.iter_unpack(data[:end]):
+            self.free.append(slot)
+            self.written += 1
+        self.pending = data[end:]
+
+    def summary(self):
+        copy = self.copy_time / max(1, self.frames - self.dropped) * 1000
+        return (f"{self.written} of {self.frames} frames written to {self.out_dir}, {self.dropped} dropped "
+                f"({self.dropped / max(1, self.frames):.1%}); {copy:.2f} ms per frame on the game loop")
+
+    def close(self, timeout=30.0):
+        """Let the writer finish the queued frames, then free the ring; returns summary()."""
+        if self.process is not None:
+            os.set_blocking(self.process.stdout.fileno(), True)
+            try:
+                self.process.stdin.write(JOB.pack(-1, 0))
+                out, _ = self.process.communicate(timeout=timeout)
+                self.collect(out)
+            except subprocess.TimeoutExpired:
+                print(f"Warning: frame capture writer did not finish within {timeout:.0f} s")
+                self.process.kill()
+                self.process.communicate()
+            except BrokenPipeError:
+                print("Warning: frame capture writer exited early")
+                self.collect(self.process.communicate()[0])
+            self.process = None
+        self.shm.close()
+        self.shm.unlink()
+        return self.summary()
+
+
+def write_frames(shm_name, slot_bytes, size, fmt, out_dir, file_format, scale, jobs, done):
+    """The writer loop: frames named on `jobs` go to disk, freed slots go back on `done`."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # The game owns (and unlinks) the block; this process must not clean it up on exit
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    out_size = (max(1, size[0] // scale), max(1, size[1] // scale))
+    raw = open(os.path.join(out_dir, 'frames.raw'), 'wb') if file_format == 'raw' else None
+    kept = []
+    try:
+        while True:
+            job = jobs.read(JOB.size)
+            if len(job) < JOB.size:
+                break
+            slot, number = JOB.unpack(job)
+            if slot < 0:
+                break
+            pixels = shm.buf[slot * slot_bytes:(slot + 1) * slot_bytes]
+            frame = pygame.image.frombuffer(pixels, size, fmt)
+            if scale > 1:
+                frame = pygame.transform.smoothscale(frame, out_size)
+            else:
+                # Copy, so the slot can be given back before the encoding
+                frame = frame.copy()
+            del pixels
+            done.write(DONE.pack(slot))
+            done.flush()
+            if raw is not None:
+                raw.write(pygame.image.tobytes(frame, 'RGB'))
+            else:
+                # The screen's unused byte comes through as alpha (often 0): make it opaque
+                frame.fill((0, 0, 0, 255), special_flags=pygame.BLEND_RGBA_MAX)
+                pygame.image.save(frame, os.path.join(out_dir, f'frame_{number:06d}.png'))
+            kept.append(number)
+    finally:
+        if raw is not None:
+            raw.close()
+            with open(os.path.join(out_dir, 'frames.json'), 'w') as f:
+                json.dump({'width': out_size[0], 'height': out_size[1], 'format': 'RGB',
+                           'frames': len(kept), 'numbers': kept}, f)
+        shm.close()
+
+
+if __name__ == '__main__':
+    # Ctrl+C in the game's terminal reaches this process too; the game stops it once the queue is written
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    name, slot_bytes, width, height, fmt, out_dir, file_format, scale = sys.argv[1:9]
+    write_frames(name, int(slot_bytes), (int(width), int(height)), fmt, out_dir, file_format, int(scale),
+                 sys.stdin.buffer, sys.stdout.buffer)
@@ -0,0 +1,154 @@
+"""Endless mode: a brick field that keeps scrolling down towards the paddle.
+
+The rows come from a generator that yields them in chunks: each chunk is one
+level layout from levelgen (difficulty rising chunk by chunk) followed by an
+empty spacer row. A chunk is only generated when the rows waiting to enter run
+out, and a row only becomes Brick objects when it enters the field just under
+the HUD. Rows that scroll down to the danger line are released: their bricks
+leave Game.bricks and the brick grid, and a row that still has bricks standing
+costs a life. Game.bricks therefore only ever holds the rows in view (about a
+dozen), so collisions, drawing and memory cost the same after an hour as after
+a minute.
+
+Everything here is driven by Game.tick_input and uses no randomness but
+levelgen's seeded layouts, so endless games replay like campaign games.
+"""
+from collections import deque
+
+import levels
+import levelgen
+
+# Top of the scrolling field (just under the HUD) and where rows are released
+FIELD_TOP = 80
+DANGER_LINE = 480
+# Generated bricks are 30 px high with 5 px between rows
+ROW_PITCH = 35
+# Rows already in place when a game starts
+START_ROWS = 5
+# Ticks per pixel of scrolling at the start and at the fastest, and the chunks between speed-ups
+START_SCROLL_INTERVAL = 12
+MIN_SCROLL_INTERVAL = 3
+CHUNKS_PER_SPEEDUP = 2
+
+
+def row_chunks(seed):
+    """Yield (difficulty, rows) forever; a row is a list of brick records, bottom row first."""
+    difficulty = 0
+    while True:
+        difficulty += 1
+        data = levelgen.generate_level(seed, difficulty)
+        rows = [[] for _ in data['grid']]
+        for record in levels.compile_level(data):
+            rows[record[4]].append(record)
+        # Rows enter at the top, so the layout's bottom row goes first; a spacer follows
+        yield difficulty, rows[::-1] + [[]]
+
+
+class EndlessField:
+    """The scrolling rows of one endless game played by `game`."""
+    def __init__(self, game, seed):
+        self.game = game
+        self.chunks = row_chunks(seed)
+        # Rows waiting to enter, as (difficulty, brick records)
+        self.pending = deque()
+        # Rows in view, bottom first, as [top y, bricks]
+        self.rows = deque()
+        self.ticks = 0
+        self.scroll_interval = START_SCROLL_INTERVAL
+        self.rows_entered = 0
+        self.rows_released = 0
+
+    @property
+    def top(self):
+        """Top y of the newest row."""
+        return self.rows[-1][0] if self.rows else FIELD_TOP + ROW_PITCH
+
+    def start(self):
+        """Fill the top of the field with the first rows."""
+        for i in range(START_ROWS):
+            self.enter_row(FIELD_TOP + (START_ROWS - 1 - i) * ROW_PITCH)
+
+    def enter_row(self, y):
+        game = self.game
+        if not self.pending:
+            difficulty, rows = next(self.chunks)
+            self.pending.extend((difficulty, row) for row in rows)
+        difficulty, records = self.pending.popleft()
+        # Rows are numbered as they enter, so explosions find the bricks of the rows next to theirs
+        bricks = [game.spawn_brick(x, y, color, hits, width, height, self.rows_entered, col)
+                  for x, _, width, height, _, col, color, hits, _, _ in records]
+        self.rows.append([y, bricks])
+        self.rows_entered += 1
+        if game.broadcast is not None:
+            for brick in bricks:
+                game.broadcast.note_added(brick)
+        game.renderer.invalidate((0, y, game.screen.get_width(), ROW_PITCH))
+        game.total_bricks += len(bricks)
+        if difficulty > game.level:
+            # A new chunk is the next level: it scrolls faster
+            game.level = difficulty
+            self.scroll_interval = max(MIN_SCROLL_INTERVAL,
+                                       START_SCROLL_INTERVAL - (difficulty - 1) // CHUNKS_PER_SPEEDUP)
+
+    def release_row(self):
+        """Drop the bottom row; returns how many of its bricks were still standing."""
+        game = self.game
+        standing = 0
+        y, bricks = self.rows.popleft()
+        game.renderer.invalidate((0, y, game.screen.get_width(), ROW_PITCH))
+        for brick in bricks:
+            if brick.slot != -1:
+                game.remove_brick(brick)
+                standing += 1
+                if game.broadcast is not None:
+                    game.broadcast.note_hit(brick)
+        game.total_bricks -= standing
+        self.rows_released += 1
+        return standing
+
+    def scroll(self, pixels):
+        game = self.game
+        grid = game.brick_grid
+        if self.rows:
+            # The field, from under the HUD to just below its bottom row once moved
+            bottom = self.rows[0][0] + ROW_PITCH + pixels
+            game.renderer.scroll((0, FIELD_TOP, game.screen.get_width(), bottom - FIELD_TOP), pixels)
+        for row in self.rows:
+            row[0] += pixels
+            for brick in row[1]:
+                if brick.slot == -1:
+                    continue
+                # Most steps keep a brick in the same grid cells, so it only moves in the grid when not
+                moved = brick.rect.move(0, pixels)
+                if grid.cell_range(moved) != grid.cell_range(brick.rect):
+                    grid.remove(brick)
+                    brick.rect = moved
+                    grid.insert(brick)
+                else:
+                    brick.rect = moved
+        game.brick_version += 1
+        game.scroll_offset += pixels
+
+        # A brick that moved onto the ball is hit, and the ball heads back down
+        ball = game.ball
+        for brick in grid.query(ball.rect):
+            if brick.slot != -1 and brick.rect.colliderect(ball.rect):
+                ball.dy = abs(ball.dy)
+                game.hit_brick(brick)
+
+    def update(self):
+        """One tick of play: scroll, let new rows in at the top and release rows at the bottom."""
+        game = self.game
+        self.ticks += 1
+        if self.ticks % self.scroll_interval:
+            return
+        self.scroll(1)
+        while self.top - ROW_PITCH >= FIELD_TOP:
+            self.enter_row(self.top - ROW_PITCH)
+        while self.rows and self.rows[0][0] + ROW_PITCH >= DANGER_LINE:
+            if self.release_row():
+                game.breach()
+                if game.lives <= 0:
+                    return
+        if game.multiball is not None:
+            game.rebuild_brick_field()
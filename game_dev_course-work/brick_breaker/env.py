@@ -0,0 +1,249 @@
+"""Step/reset environment API for training paddle-control agents.
+
+BrickBreakerEnv wraps a headless Game in the reset()/step() interface of Gym
+(Gymnasium flavour: step returns obs, reward, terminated, truncated, info) with
+no window and no frame limiter, so it runs as fast as the physics does.
+Actions are either discrete (0 stay, 1 left, 2 right) or continuous (a float
+in [-1, 1], the fraction of the paddle's top speed to move this tick).
+
+An observation is one float32 vector of OBS_SIZE values:
+
+    [0:4]  ball x, y, dx, dy    (x and y as fractions of the screen, speeds / 10)
+    [4]    paddle centre x      (fraction of the screen width)
+    [5:]   brick-alive bitmap   (GRID_ROWS x GRID_COLS, row-major, 1.0 = brick)
+
+The bitmap uses the row and column each brick has in its level file.
+
+VectorEnv steps N environments split over worker processes. Actions,
+observations, rewards and done flags live in shared memory, so a step only
+sends a one-word command down each worker's pipe. Finished environments
+reset themselves straight away. Throughput is measured by
+`python benchmarks.py env`.
+"""
+import os
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import brick_breaker as bb
+
+GRID_ROWS = 8
+GRID_COLS = 10
+OBS_SIZE = 5 + GRID_ROWS * GRID_COLS
+# Reward taken off for each life lost; breaking bricks earns their points
+LIFE_PENALTY = 100
+# Episodes are cut off (truncated) after this many ticks (10 minutes of game time)
+MAX_EPISODE_TICKS = bb.TICK_RATE * 600
+
+DISCRETE = 'discrete'
+CONTINUOUS = 'continuous'
+
+
+class BrickBreakerEnv:
+    """One headless game behind a reset()/step() API.
+
+    Episodes are seeded: `seed` seeds the first one and each reset adds
+    `seed_stride`, unless reset() is given a seed. Ticks per step can be raised
+    with `frame_skip`, repeating the action. Observations are written into
+    `obs` (a float32 array of OBS_SIZE) when given, e.g. a row of shared memory.
+    """
+    def __init__(self, seed=0, action_type=DISCRETE, frame_skip=1, max_ticks=MAX_EPISODE_TICKS, seed_stride=1,
+                 obs=None):
+        if action_type not in (DISCRETE, CONTINUOUS):
+            raise ValueError(f'unknown action type {action_type!r}')
+        self.action_type = action_type
+        self.frame_skip = frame_skip
+        self.max_ticks = max_ticks
+        self.next_seed = seed
+        self.seed_stride = seed_stride
+        self.game = None
+        self.ticks = 0
+        self.obs = np.zeros(OBS_SIZE, dtype=np.float32) if obs is None else obs
+        self.bitmap_version = None
+
+    def reset(self, seed=None):
+        """Start a new episode; returns (observation, info)."""
+        if seed is None:
+            seed = self.next_seed
+            self.next_seed += self.seed_stride
+        self.game = bb.Game(headless=True, seed=seed)
+        self.game.state = bb.STATE_READY
+        self.ticks = 0
+        self.bitmap_version = None
+        return self.observe(), {'seed': seed}
+
+    def step(self, action):
+        """Apply `action` for frame_skip ticks; returns (obs, reward, terminated, truncated, info)."""
+        reward, terminated, truncated = self.advance(action)
+        game = self.game
+        return self.observe(), reward, terminated, truncated, {'score': game.score, 'level': game.level,
+                                                               'lives': game.lives}
+
+    def advance(self, action):
+        """step() without building the observation: returns (reward, terminated, truncated)."""
+        game = self.game
+        score, lives = game.score, game.lives
+        for _ in range(self.frame_skip):
+            # The ball is launched, and finished levels are left, without waiting for an action
+            space = game.state in (bb.STATE_READY, bb.STATE_LEVEL_COMPLETE)
+            if self.action_type == DISCRETE:
+                game.tick(action == 1, action == 2, space)
+            else:
+                paddle = game.paddle
+                move = round(max(-1.0, min(1.0, float(action))) * paddle.speed)
+                paddle.rect.x = max(0, min(bb.SCREEN_WIDTH - paddle.rect.width, paddle.rect.x + move))
+                game.tick(False, False, space)
+            self.ticks += 1
+            if game.state == bb.STATE_GAME_OVER:
+                break
+        reward = float(game.score - score - LIFE_PENALTY * (lives - game.lives))
+        terminated = game.state == bb.STATE_GAME_OVER
+        truncated = not terminated and self.ticks >= self.max_ticks
+        return reward, terminated, truncated
+
+    def observe(self):
+        """Update the observation buffer from the game and return it."""
+        game = self.game
+        obs = self.obs
+        ball = game.ball
+        obs[0] = ball.x / bb.SCREEN_WIDTH
+        obs[1] = ball.y / bb.SCREEN_HEIGHT
+        obs[2] = ball.dx / 10
+        obs[3] = ball.dy / 10
+        obs[4] = game.paddle.rect.centerx / bb.SCREEN_WIDTH
+        # The bitmap only changes when a brick does
+        if game.brick_version != self.bitmap_version:
+            self.bitmap_version = game.brick_version
+            bitmap = obs[5:]
+            bitmap[:] = 0
+            for brick in game.bricks:
+                if 0 <= brick.row < GRID_ROWS and 0 <= brick.col < GRID_COLS:
+                    bitmap[brick.row * GRID_COLS + brick.col] = 1
+        return obs
+
+
+def _shared_array(shape, dtype, name=None):
+    """(SharedMemory, ndarray view of it); creates the block when no name is given."""
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    shm = shared_memory.SharedMemory(name=name, create=name is None, size=max(1, size) if name is None else 0)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _worker(conn, names, num_envs, start, stop, seed, action_type, frame_skip, max_ticks):
+    blocks = []
+    arrays = {}
+    for key, (name, shape, dtype) in names.items():
+        shm, arrays[key] = _shared_array(shape, dtype, name)
+        blocks.append(shm)
+    obs, actions = arrays['obs'], arrays['actions']
+    rewards, terminated, truncated = arrays['rewards'], arrays['terminated'], arrays['truncated']
+    envs = [BrickBreakerEnv(seed + i, action_type, frame_skip, max_ticks, seed_stride=num_envs, obs=obs[i])
+            for i in range(start, stop)]
+    try:
+        while True:
+            command = conn.recv()
+            if command == 'step':
+                for i, env in enumerate(envs, start):
+                    action = actions[i] if action_type == CONTINUOUS else int(actions[i])
+                    rewards[i], terminated[i], truncated[i] = env.advance(action)
+                    if terminated[i] or truncated[i]:
+                        env.reset()
+                    else:
+                        env.observe()
+            elif command == 'reset':
+                for env in envs:
+                    env.reset()
+            else:
+                break
+            conn.send(None)
+    finally:
+        del envs, obs, actions, rewards, terminated, truncated, arrays
+        for shm in blocks:
+            shm.close()
+
+
+class VectorEnv:
+    """`num_envs` environments stepped together by `workers` processes.
+
+    step() and reset() return views of the shared buffers, which the next call
+    overwrites; copy them to keep them. An environment whose episode ends is
+    reset within the same step, so its returned observation is already the
+    first of the next episode.
+    """
+    def __init__(self, num_envs, workers=None, seed=0, action_type=DISCRETE, frame_skip=1,
+                 max_ticks=MAX_EPISODE_TICKS):
+        self.num_envs = num_envs
+        self.action_type = action_type
+        workers = max(1, min(num_envs, workers or os.cpu_count() or 1))
+        layout = {
+            'obs': ((num_envs, OBS_SIZE), np.float32),
+            'actions': ((num_envs,), np.float32 if action_type == CONTINUOUS else np.int64),
+            'rewards': ((num_envs,), np.float32),
+            'terminated': ((num_envs,), np.bool_),
+            'truncated': ((num_envs,), np.bool_),
+        }
+        self.blocks = {}
+        names = {}
+        for key, (shape, dtype) in layout.items():
+            shm, array = _shared_array(shape, dtype)
+            self.blocks[key] = shm
+            setattr(self, key, array)
+            names[key] = (shm.name, shape, dtype)
+
+        self.conns = []
+        self.processes = []
+        # Spawned, not forked: a forked worker would inherit the caller's threads (their locks
+        # possibly held), pygame/SDL state and open files
+        context = mp.get_context('spawn')
+        bounds = np.linspace(0, num_envs, workers + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker, args=(child, names, num_envs, int(start), int(stop), seed,
+                                                            action_type, frame_skip, max_ticks), daemon=True)
+            process.start()
+            child.close()
+            self.conns.append(parent)
+            self.processes.append(process)
+
+    def _command(self, command):
+        for conn in self.conns:
+            conn.send(command)
+        for conn in self.conns:
+            conn.recv()
+
+    def reset(self):
+        self._command('reset')
+        return self.obs
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self._command('step')
+        return self.obs, self.rewards, self.terminated, self.truncated
+
+    def close(self):
+        if self.processes:
+            for conn in self.conns:
+                conn.send('close')
+            for process in self.processes:
+                process.join()
+            self.processes = []
+        for key, shm in self.blocks.items():
+            delattr(self, key)
+            shm.unlink()
+            try:
+                shm.close()
+            except BufferError:
+                # The caller still holds a view; the mapping goes when that does
+                pass
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
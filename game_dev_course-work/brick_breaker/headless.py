@@ -0,0 +1,134 @@
+"""Headless batch simulation of the brick breaker.
+
+Plays many seeded games with no window and no audio, spread over a process
+pool, and reports throughput and aggregate statistics. Run from this folder:
+
+    python headless.py --games 1000 --workers 8
+    python headless.py --games 200 --script "LLLL....RRRR...."
+    python headless.py --games 1000 --autopilot
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import brick_breaker as bb
+
+# Ticks after which a game is stopped (10 minutes of game time)
+MAX_TICKS = bb.TICK_RATE * 600
+
+
+class AutoPaddle:
+    """Follows the ball, aiming a random distance off-centre after every bounce
+    so the ball angle keeps changing. The paddle speed limit still applies, so
+    fast balls can be missed."""
+    def __init__(self, seed, max_offset=40):
+        self.rng = random.Random(seed)
+        self.max_offset = max_offset
+        self.offset = 0
+        self.last_dy = 0
+
+    def __call__(self, game):
+        if game.ball.dy < 0 <= self.last_dy:
+            self.offset = self.rng.uniform(-self.max_offset, self.max_offset)
+        self.last_dy = game.ball.dy
+        error = game.ball.rect.centerx + self.offset - game.paddle.rect.centerx
+        return error < -game.paddle.speed / 2, error > game.paddle.speed / 2
+
+
+class ScriptedPaddle:
+    """Plays a fixed input script, one character per tick, looping at the end:
+    'L' moves left, 'R' moves right, anything else stays still."""
+    def __init__(self, script):
+        self.script = script or '.'
+        self.position = 0
+
+    def __call__(self, game):
+        move = self.script[self.position % len(self.script)]
+        self.position += 1
+        return move == 'L', move == 'R'
+
+
+def simulate_game(seed, script=None, max_ticks=MAX_TICKS, autopilot=False):
+    """Play one headless game to the end and return its statistics."""
+    game = bb.Game(headless=True, seed=seed)
+    if autopilot:
+        paddle = bb.Autopilot(seed)
+    else:
+        paddle = ScriptedPaddle(script) if script else AutoPaddle(seed)
+    start_lives = game.lives
+    game.state = bb.STATE_READY
+
+    ticks = 0
+    while ticks < max_ticks and game.state != bb.STATE_GAME_OVER:
+        # Launch the ball and continue past level-complete screens straight away
+        space = game.state in (bb.STATE_READY, bb.STATE_LEVEL_COMPLETE)
+        left, right = paddle(game)
+        game.tick(left, right, space)
+        ticks += 1
+
+    return {
+        'seed': seed,
+        'score': game.score,
+        'lives_lost': start_lives - game.lives,
+        'level': min(game.level, game.levels.count),
+        'won': game.level > game.levels.count,
+        'ticks': ticks,
+        'timed_out': game.state != bb.STATE_GAME_OVER,
+    }
+
+
+def _simulate(args):
+    return simulate_game(*args)
+
+
+def run_batch(games, workers=None, seed=0, script=None, max_ticks=MAX_TICKS, autopilot=False):
+    """Play `games` seeded games over a process pool; returns (results, seconds)."""
+    jobs = [(seed + i, script, max_ticks, autopilot) for i in range(games)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk = max(1, games // ((workers or os.cpu_count() or 1) * 4))
+        results = list(pool.map(_simulate, jobs, chunksize=chunk))
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    n = len(results)
+    scores = sorted(r['score'] for r in results)
+    lines = [
+        f"games:        {n} in {elapsed:.2f}s ({n / elapsed:.1f} games/s, "
+        f"{sum(r['ticks'] for r in results) / elapsed:,.0f} ticks/s)",
+        f"score:        mean {sum(scores) / n:.1f}, median {scores[n // 2]}, "
+        f"min {scores[0]}, max {scores[-1]}",
+        f"lives lost:   mean {sum(r['lives_lost'] for r in results) / n:.2f}",
+    ]
+    for level in range(1, max(r['level'] for r in results) + 1):
+        reached = sum(1 for r in results if r['level'] == level and not r['won'])
+        lines.append(f"ended on L{level}: {reached}")
+    lines.append(f"won:          {sum(1 for r in results if r['won'])}")
+    lines.append(f"timed out:    {sum(1 for r in results if r['timed_out'])}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run seeded brick breaker games headless over a process pool.')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help='default: one per CPU')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game; game i uses seed + i')
+    parser.add_argument('--script', default=None, help="paddle input script ('L', 'R', '.') instead of the auto paddle")
+    parser.add_argument('--autopilot', action='store_true', help='play with the trajectory-predicting autopilot')
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS)
+    args = parser.parse_args(argv)
+
+    results, elapsed = run_batch(args.games, args.workers, args.seed, args.script, args.max_ticks, args.autopilot)
+    print(summarize(results, elapsed))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
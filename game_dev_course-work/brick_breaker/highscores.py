@@ -0,0 +1,273 @@
+"""Persistent high scores for the brick breaker.
+
+Every finished game is appended as one fixed-size SESSION record to a session
+log (scores/sessions.bin). The log is never read at startup. What the game
+shows comes from a small index (scores/index.json): the top TOP_SIZE games,
+per-level statistics, and how much of the log those cover. If the log has
+grown past what the index covers, only that tail is read; a missing or
+unreadable index is rebuilt from the whole log. So loading costs the same with
+ten sessions or a hundred thousand, bar the rebuild.
+
+Neither loading nor writing happens on the game loop's thread. start() runs a
+writer thread that loads the index, then takes the games record() hands it:
+it ranks each against the in-memory index, appends them to the log, fsyncs
+it, then writes the index to a temporary file and renames it over the old
+one. Until the load is done the table reads as empty (see ready). A kill at
+any point leaves a usable store:
+
+- a half-written log record is cut off the next time the log is appended to;
+- the index is either the old one or the new one, never a mix;
+- an index that lags the log catches up from the log's tail on the next load.
+"""
+import os
+import json
+import queue
+import struct
+import threading
+import time
+
+SCORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scores')
+# Games kept in the high-score table
+TOP_SIZE = 10
+
+LOG_MAGIC = b'BBHS'
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct('<4sB')
+# end time (Unix seconds), seed, score, level reached, won, seconds played
+SESSION = struct.Struct('<dIIHBf')
+INDEX_VERSION = 1
+
+# Per-level statistics: games that reached the level, cleared it, ended on it, best final score
+REACHED, CLEARED, ENDED, BEST = range(4)
+
+
+class HighScores:
+    """The high-score table and per-level statistics kept in `folder`."""
+    def __init__(self, folder=SCORE_DIR, size=TOP_SIZE):
+        self.folder = folder
+        self.size = size
+        self.log_path = os.path.join(folder, 'sessions.bin')
+        self.index_path = os.path.join(folder, 'index.json')
+        # Set once the index is loaded; the table reads as empty until then
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.writer = None
+        # Games handed to record(), and the table ranks of those that made it, by ticket
+        self.recorded = 0
+        self.applied = 0
+        self.ranks = {}
+        # In-memory index: [score, level, won, end time, seconds] per top game, level -> stats
+        self.top = []
+        self.levels = {}
+        self.sessions = 0
+        # Bytes of the log the index covers (the file may be longer when a write was cut
+        # off); None when the log could not be read, so nothing is saved over it
+        self.log_size = LOG_HEADER.size
+
+    # Reading
+
+    def load(self):
+        """Load the index (and any log tail it is missing) if that has not happened yet.
+
+        The writer thread does this first thing; call it directly only when no writer runs.
+        """
+        if self.ready.is_set():
+            return
+        try:
+            self._load()
+        finally:
+            self.ready.set()
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+            if not isinstance(index, dict):
+                raise ValueError(f"expected an object, got {type(index).__name__}")
+            if index.get('version') != INDEX_VERSION:
+                raise ValueError(f"index version {index.get('version')}")
+            self.top = [list(entry) for entry in index['top']]
+            self.levels = {int(level): list(stats) for level, stats in index['levels'].items()}
+            self.sessions = int(index['sessions'])
+            self.log_size = int(index['log_size'])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Warning: rebuilding high-score index {self.index_path}: {e}")
+            self.top, self.levels, self.sessions, self.log_size = [], {}, 0, LOG_HEADER.size
+
+        try:
+            with open(self.log_path, 'rb') as f:
+                header = f.read(LOG_HEADER.size)
+                end = os.fstat(f.fileno()).st_size
+                if len(header) < LOG_HEADER.size:
+                    # Killed before the header was written: the same as no log
+                    raise FileNotFoundError(self.log_path)
+                if header != LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION):
+                    print(f"Warning: ignoring unreadable session log {self.log_path}")
+                    self.log_size = None
+                    return
+                # Only whole records count; a cut-off one at the end is dropped
+                end -= (end - LOG_HEADER.size) % SESSION.size
+                if end < self.log_size:
+                    # The log is shorter than the index says: start over from the log
+                    self.top, self.levels, self.sessions, self.log_size = [], {}, 0, LOG_HEADER.size
+                f.seek(self.log_size)
+                tail = f.read(end - self.log_size)
+        except FileNotFoundError:
+            self.top, self.levels, self.sessions, self.log_size = [], {}, 0, LOG_HEADER.size
+            return
+        except OSError as e:
+            print(f"Warning: could not read session log {self.log_path}: {e}")
+            self.log_size = None
+            return
+        for record in SESSION.iter_unpack(tail):
+            self._apply(*record)
+        self.log_size += len(tail)
+
+    def table(self):
+        """The top games, best first, as [score, level, won, end time, seconds] lists."""
+        if not self.ready.is_set():
+            return []
+        with self.lock:
+            return list(self.top)
+
+    def level_stats(self, level):
+        """(reached, cleared, ended, best score) over every recorded game for `level`."""
+        if not self.ready.is_set():
+            return (0, 0, 0, 0)
+        with self.lock:
+            return tuple(self.levels.get(level, (0, 0, 0, 0)))
+
+    def rank(self, ticket):
+        """The 1-based table rank of the game record() gave `ticket` for.
+
+        None if it did not make the table, or the writer has not got to it yet.
+        """
+        with self.lock:
+            return self.ranks.get(ticket)
+
+    def _apply(self, end_time, seed, score, level, won, seconds):
+        """Add one session to the in-memory index; returns its rank in the table or None."""
+        self.sessions += 1
+        for number in range(1, level + 1):
+            stats = self.levels.setdefault(number, [0, 0, 0, 0])
+            stats[REACHED] += 1
+            stats[BEST] = max(stats[BEST], score)
+            if number < level or won:
+                stats[CLEARED] += 1
+            else:
+                stats[ENDED] += 1
+        # Equal scores keep the earlier game ahead
+        rank = next((i for i, entry in enumerate(self.top) if score > entry[0]), len(self.top))
+        if rank >= self.size:
+            return None
+        self.top.insert(rank, [score, level, bool(won), end_time, round(seconds, 1)])
+        del self.top[self.size:]
+        return rank + 1
+
+    # Writing
+
+    def record(self, score, level, won, seed=0, seconds=0.0):
+        """Record a finished game; returns a ticket to look its rank up with (see rank).
+
+        Only queues the game: the writer thread ranks it once the index is loaded,
+        then writes the files.
+        """
+        record = (time.time(), seed & 0xFFFFFFFF, max(0, score), level, int(won), seconds)
+        with self.lock:
+            self.recorded += 1
+            ticket = self.recorded
+        self.queue.put(record)
+        self.start()
+        return ticket
+
+    def start(self):
+        """Start the writer thread, which loads the index in the background first."""
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, name='highscores', daemon=True)
+            self.writer.start()
+
+    def _write_loop(self):
+        try:
+            self.load()
+        except Exception as e:
+            # Rank against an empty table, and leave the log alone rather than write over it
+            print(f"Warning: could not load high scores from {self.folder}: {e}")
+            with self.lock:
+                self.top, self.levels, self.sessions, self.log_size = [], {}, 0, None
+        while True:
+            records = [self.queue.get()]
+            # Everything queued meanwhile goes out in the same write
+            while True:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = None in records
+            records = [r for r in records if r is not None]
+            try:
+                self._write(records)
+            except Exception as e:
+                # One bad batch must not stop the games after it being saved
+                print(f"Warning: could not save high scores to {self.folder}: {e}")
+            finally:
+                for _ in range(len(records) + closing):
+                    self.queue.task_done()
+            if closing:
+                return
+
+    def _write(self, records):
+        """Rank `records` against the table, then append them to the log."""
+        with self.lock:
+            for record in records:
+                self.applied += 1
+                rank = self._apply(*record)
+                if rank is not None:
+                    self.ranks[self.applied] = rank
+        if records and self.log_size is not None:
+            self._append(b''.join(SESSION.pack(*r) for r in records))
+
+    def _append(self, data):
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.log_path, 'ab') as f:
+            size = f.tell()
+            if size < LOG_HEADER.size:
+                f.truncate(0)
+                f.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+                self.log_size = LOG_HEADER.size
+            elif size > self.log_size:
+                # Drop what a cut-off write left behind (append mode still writes at the end)
+                f.truncate(self.log_size)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Games are ranked on this thread too, so the index now covers exactly the log
+        with self.lock:
+            self.log_size += len(data)
+            snapshot = json.dumps({
+                'version': INDEX_VERSION,
+                'sessions': self.sessions,
+                'log_size': self.log_size,
+                'top': self.top,
+                'levels': self.levels,
+            })
+        tmp = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.index_path)
+
+    def flush(self):
+        """Wait until everything recorded so far is on disk."""
+        if self.writer is not None:
+            self.queue.join()
+
+    def close(self, timeout=2.0):
+        """Stop the writer thread after it has written what is queued (waits at most `timeout`)."""
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join(timeout)
+            self.writer = None
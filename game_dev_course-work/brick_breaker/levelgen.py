@@ -0,0 +1,173 @@
+"""Seeded procedural levels for after the level files run out.
+
+generate_level(seed, difficulty) builds a level in the JSON level format of
+levels.py, so it compiles and caches like a file level, and the same (seed,
+difficulty) always gives the same layout. A layout is a pattern (full wall,
+checkerboard, diamond, pyramid, castle, stripes or random blocks) that is
+mirrored left to right. Rows are coloured in bands that are worth more
+towards the top. Silver, gold and explosive bricks are then spread over it
+with a density that grows with difficulty, under a few constraints:
+
+- no two gold bricks touch;
+- the bottom row has no silver, so the first hits always break something;
+- every row keeps at least half of its bricks plain.
+
+LevelGenerator keeps generated levels in an LRU cache in memory and in
+binary files under levels/.cache/, and can generate one on a background
+thread ahead of time (prefetch), so starting it does not stall a frame.
+"""
+import os
+import random
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import levels
+
+# Bump when generate_level changes, so stale disk-cached levels are rebuilt
+GENERATOR_VERSION = 2
+COLS = 10
+MAX_ROWS = 8
+PATTERNS = ('full', 'checker', 'diamond', 'pyramid', 'castle', 'stripes', 'blocks')
+# Brick type characters: four plain colours, silver, gold and explosive (indices into BRICK_COLORS)
+PLAIN = 'ROGY'
+SILVER = 'S'
+GOLD = 'A'
+EXPLOSIVE = 'X'
+
+
+def _pattern_mask(pattern, rows, half, rng):
+    """Which cells of the left half hold a brick, as rows of booleans."""
+    mask = []
+    for r in range(rows):
+        row = []
+        for c in range(half):
+            if pattern == 'full':
+                cell = True
+            elif pattern == 'checker':
+                cell = (r + c) % 2 == 0
+            elif pattern == 'diamond':
+                # Distance from the middle of the full width, which is after column half - 1
+                cell = abs(r - (rows - 1) / 2) + (half - 1 - c) <= max(rows, half) / 1.5
+            elif pattern == 'pyramid':
+                cell = half - 1 - c <= r
+            elif pattern == 'castle':
+                # Battlements on top of a solid wall
+                cell = r > 0 or c % 2 == 0
+            elif pattern == 'stripes':
+                cell = r % 2 == 0 or c == 0
+            else:
+                cell = rng.random() < 0.7
+            row.append(cell)
+        mask.append(row)
+    return mask
+
+
+def generate_level(seed, difficulty):
+    """Level data (JSON level format) for `difficulty` >= 1 of the campaign `seed`."""
+    rng = random.Random(f'{GENERATOR_VERSION}:{seed}:{difficulty}')
+    rows = min(MAX_ROWS, 4 + difficulty // 2)
+    half = COLS // 2
+    pattern = rng.choice(PATTERNS)
+    mask = _pattern_mask(pattern, rows, half, rng)
+    # Too sparse a pattern falls back to a full wall
+    if sum(map(sum, mask)) * 2 < 12:
+        pattern = 'full'
+        mask = _pattern_mask(pattern, rows, half, rng)
+
+    silver_density = min(0.35, 0.05 + 0.04 * difficulty)
+    gold_density = min(0.15, 0.02 + 0.015 * difficulty)
+    explosive_density = min(0.12, 0.01 + 0.01 * difficulty)
+    grid = []
+    for r, row in enumerate(mask):
+        # Colour bands: the top rows are worth most
+        band = PLAIN[max(0, len(PLAIN) - 1 - r * len(PLAIN) // rows)]
+        cells = [band if cell else '.' for cell in row]
+        filled = [c for c, cell in enumerate(row) if cell]
+        specials = 0
+        for c in filled:
+            if specials * 2 >= len(filled) - 1:
+                break
+            roll = rng.random()
+            # Gold stays off the middle column, whose mirror image would touch it
+            if roll < gold_density and c < half - 1:
+                neighbours = [cells[c - 1] if c else '.', grid[r - 1][c] if r else '.']
+                if GOLD not in neighbours:
+                    cells[c] = GOLD
+                    specials += 1
+            elif roll < gold_density + silver_density and r < rows - 1:
+                cells[c] = SILVER
+                specials += 1
+            elif roll < gold_density + silver_density + explosive_density:
+                cells[c] = EXPLOSIVE
+                specials += 1
+        grid.append(cells)
+
+    # Mirror the left half to fill the row
+    lines = [''.join(cells) + ''.join(reversed(cells)) for cells in grid]
+    silver_hits = min(4, 2 + difficulty // 5)
+    return {
+        'name': f'Generated {difficulty} ({pattern})',
+        'brick_width': 70, 'brick_height': 30, 'left': 5, 'top': 80, 'gap': 5,
+        'bricks': {
+            'R': {'color': 0}, 'O': {'color': 1}, 'G': {'color': 2}, 'Y': {'color': 3},
+            'S': {'color': 4, 'hits': silver_hits}, 'A': {'color': 5},
+            'X': {'color': 6},
+        },
+        'grid': lines,
+    }
+
+
+class LevelGenerator:
+    """`count` generated levels of campaign `seed`, numbered from 1 (difficulty = number).
+
+    Compiled levels are kept in an LRU of `max_cached` entries and on disk in
+    `cache_dir`; prefetch() builds one on a worker thread so get() later finds
+    it ready.
+    """
+    def __init__(self, seed, count=12, cache_dir=os.path.join(levels.LEVEL_DIR, '.cache'), max_cached=8):
+        self.seed = seed
+        self.count = count
+        self.cache_dir = cache_dir
+        self.max_cached = max_cached
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.pool = None
+
+    def _key_digest(self, difficulty):
+        return hashlib.blake2b(f'levelgen:{GENERATOR_VERSION}:{self.seed}:{difficulty}'.encode(),
+                               digest_size=16).digest()
+
+    def _build(self, difficulty):
+        """Load the level from the disk cache, or generate, compile and cache it."""
+        path = os.path.join(self.cache_dir, f'gen_{self.seed}_{difficulty}.bbl')
+        digest = self._key_digest(difficulty)
+        level = levels.read_cache(path, digest)
+        if level is None:
+            data = generate_level(self.seed, difficulty)
+            level = levels.CompiledLevel(data['name'], levels.compile_level(data))
+            try:
+                levels.write_cache(path, level, digest)
+            except OSError as e:
+                print(f"Warning: could not write level cache {path}: {e}")
+        return level
+
+    def get(self, difficulty):
+        key = (self.seed, difficulty)
+        level = self.cache.get(key)
+        if level is not None:
+            self.cache.move_to_end(key)
+            return level
+        future = self.pending.pop(difficulty, None)
+        level = future.result() if future is not None else self._build(difficulty)
+        self.cache[key] = level
+        if len(self.cache) > self.max_cached:
+            self.cache.popitem(last=False)
+        return level
+
+    def prefetch(self, difficulty):
+        if (self.seed, difficulty) in self.cache or difficulty in self.pending:
+            return
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='levelgen')
+        self.pending[difficulty] = self.pool.submit(self._build, difficulty)
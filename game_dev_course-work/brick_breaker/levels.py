@@ -0,0 +1,231 @@
+"""Data-driven brick breaker levels with a compiled binary cache.
+
+Levels are JSON files in the levels/ folder, played in file-name order:
+
+    {
+        "name": "Outer Wall",
+        "brick_width": 70, "brick_height": 30,
+        "left": 5, "top": 80, "gap": 5,
+        "bricks": {
+            "R": {"color": 0},
+            "S": {"color": 4, "hits": 2},
+            "?": {"random": [0, 5]}
+        },
+        "grid": [
+            "RRRRRRRRRR",
+            "S.S.S.S.S.",
+            "??????????"
+        ]
+    }
+
+Each character of "grid" is one brick cell; "." (or any character not in
+"bricks") leaves the cell empty. A brick type sets its colour (an index into
+BRICK_COLORS) and optionally its hit points; "random" picks a colour from an
+inclusive range with the game's RNG each time the level starts. Colour 6 is
+the explosive brick: destroying it damages the bricks in the eight cells
+around it, which can set off a chain reaction. "gap" can be replaced by
+"gap_x"/"gap_y" for different horizontal and vertical spacing.
+
+Parsing is only done once per file: the result is compiled into a compact
+binary file under levels/.cache/ that later starts memory-map instead. A
+cache file records the source's mtime, size and hash; a changed mtime or size
+triggers a hash check, and only a changed hash triggers a recompile.
+"""
+import os
+import json
+import mmap
+import struct
+import hashlib
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels')
+
+MAGIC = b'BBLV'
+VERSION = 1
+# magic, version, source mtime_ns, source size, source hash, brick count, level name
+HEADER = struct.Struct('<4sBqq16sI32s')
+# x, y, width, height, row, col, color (-1 = random), hits, random low, random high
+RECORD = struct.Struct('<hhhhhhbbbb')
+
+
+class CompiledLevel:
+    """A level as a flat list of brick records (see RECORD)."""
+    def __init__(self, name, records):
+        self.name = name
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+
+def default_hits(color_index):
+    # Silver bricks require 2 hits
+    return 2 if color_index == 4 else 1
+
+
+def compile_level(data):
+    """Turn parsed level JSON into brick records."""
+    width = data.get('brick_width', 70)
+    height = data.get('brick_height', 30)
+    left = data.get('left', 5)
+    top = data.get('top', 80)
+    gap_x = data.get('gap_x', data.get('gap', 5))
+    gap_y = data.get('gap_y', data.get('gap', 5))
+    types = data.get('bricks', {})
+
+    records = []
+    for row, line in enumerate(data['grid']):
+        for col, char in enumerate(line):
+            kind = types.get(char)
+            if kind is None:
+                continue
+            if 'random' in kind:
+                low, high = kind['random']
+                color, hits = -1, kind.get('hits', 0)
+            else:
+                color = kind['color']
+                low = high = color
+                hits = kind.get('hits', default_hits(color))
+            records.append((left + col * (width + gap_x), top + row * (height + gap_y), width, height,
+                            row, col, color, hits, low, high))
+    return records
+
+
+def _cache_path(path):
+    folder = os.path.join(os.path.dirname(path), '.cache')
+    return os.path.join(folder, os.path.splitext(os.path.basename(path))[0] + '.bbl')
+
+
+def write_cache(cache, level, digest, mtime_ns=0, size=0):
+    """Write a compiled level to a binary cache file; `digest` identifies its source."""
+    os.makedirs(os.path.dirname(cache), exist_ok=True)
+    # Per-process temporary name, as parallel headless runs may write the same level
+    tmp = f'{cache}.{os.getpid()}.tmp'
+    records = level.records
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, mtime_ns, size, digest, len(records),
+                            level.name.encode('utf-8')[:32]))
+        for record in records:
+            f.write(RECORD.pack(*record))
+    os.replace(tmp, cache)
+
+
+def read_cache(cache, digest):
+    """The level in a cache file written with this `digest`, or None."""
+    try:
+        with open(cache, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, _, _, cached_digest, count, name = HEADER.unpack_from(data)
+    if (magic != MAGIC or version != VERSION or cached_digest != digest or
+            len(data) != HEADER.size + count * RECORD.size):
+        return None
+    return CompiledLevel(name.rstrip(b'\0').decode('utf-8', 'replace'),
+                         list(RECORD.iter_unpack(memoryview(data)[HEADER.size:])))
+
+
+def _read_cache(cache, stat, path):
+    """The level in a valid cache file, or None if it is missing or stale."""
+    try:
+        f = open(cache, 'rb')
+    except OSError:
+        return None
+    with f:
+        # An empty file cannot be mapped, and nothing shorter than a header is a cache
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            return None
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        with mm:
+            header = HEADER.unpack_from(mm)
+            magic, version, mtime, size, digest, count, name = header
+            if magic != MAGIC or version != VERSION or len(mm) != HEADER.size + count * RECORD.size:
+                return None
+            touched = (mtime, size) != (stat.st_mtime_ns, stat.st_size)
+            # Touched but maybe not changed: only a different hash means recompiling
+            if touched and _hash_file(path) != digest:
+                return None
+            view = memoryview(mm)[HEADER.size:]
+            try:
+                records = list(RECORD.iter_unpack(view))
+            finally:
+                view.release()
+    if touched:
+        _update_cache_header(cache, magic, version, stat.st_mtime_ns, stat.st_size, digest, count, name)
+    return CompiledLevel(name.rstrip(b'\0').decode('utf-8', 'replace'), records)
+
+
+def _update_cache_header(cache, *header):
+    """Record a touched source's new mtime and size so the next load skips the hash.
+
+    The cache is mapped read-only, so this is a separate write; where the cache
+    cannot be written (a read-only install) the hash is simply checked each time.
+    """
+    try:
+        with open(cache, 'r+b') as f:
+            f.write(HEADER.pack(*header))
+    except OSError:
+        pass
+
+
+def _hash_file(path):
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).digest()
+
+
+def load_level(path):
+    """Load one level file, through the binary cache when it is up to date."""
+    stat = os.stat(path)
+    cache = _cache_path(path)
+    level = _read_cache(cache, stat, path)
+    if level is None:
+        with open(path, 'rb') as f:
+            source = f.read()
+        data = json.loads(source)
+        level = CompiledLevel(data.get('name', os.path.splitext(os.path.basename(path))[0]),
+                              compile_level(data))
+        try:
+            write_cache(cache, level, hashlib.blake2b(source, digest_size=16).digest(), stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            print(f"Warning: could not write level cache {cache}: {e}")
+    return level
+
+
+class LevelLibrary:
+    """The level files of a folder, numbered from 1 and loaded on first use.
+
+    With a `generator` (see levelgen.py) its levels follow the file levels.
+    """
+    def __init__(self, folder=LEVEL_DIR, generator=None):
+        self.folder = folder
+        self.generator = generator
+        try:
+            names = sorted(n for n in os.listdir(folder) if n.endswith('.json'))
+        except OSError:
+            names = []
+        self.paths = [os.path.join(folder, n) for n in names]
+        self.loaded = {}
+
+    @property
+    def count(self):
+        return len(self.paths) + (self.generator.count if self.generator else 0)
+
+    def get(self, number):
+        """Level `number` (1-based), or None past the last level."""
+        if not 1 <= number <= self.count:
+            return None
+        if number > len(self.paths):
+            return self.generator.get(number - len(self.paths))
+        level = self.loaded.get(number)
+        if level is None:
+            level = self.loaded[number] = load_level(self.paths[number - 1])
+        return level
+
+    def prefetch(self, number):
+        """Start preparing level `number` in the background if it is a generated one."""
+        if self.generator is not None and len(self.paths) < number <= self.count:
+            self.generator.prefetch(number - len(self.paths))
@@ -0,0 +1,181 @@
+"""Array-backed multi-ball physics for the brick breaker.
+
+Ball positions and velocities live in NumPy arrays and every tick handles the
+walls, the paddle and the bricks for all balls in a few vectorised passes.
+The collision rules follow Game.handle_collisions. NumPy is only needed when
+multi-ball is used.
+"""
+import numpy as np
+
+
+class BrickField:
+    """A snapshot of the bricks as parallel arrays, for vectorised collision tests.
+
+    `bricks` keeps the Brick objects in array order so hits can be applied back
+    to the game, `alive` masks bricks that have been destroyed, and `hit_count`
+    records how many ball hits each brick has taken from this field.
+    """
+    def __init__(self, bricks, cell_width, cell_height):
+        self.bricks = list(bricks)
+        self.index = {id(brick): i for i, brick in enumerate(self.bricks)}
+        n = len(self.bricks)
+        rects = np.array([(b.rect.left, b.rect.top, b.rect.right, b.rect.bottom) for b in self.bricks],
+                         dtype=np.float64).reshape(n, 4)
+        self.left, self.top, self.right, self.bottom = (rects[:, i].copy() for i in range(4))
+        # Bounding box of the whole field, (left, top, right, bottom)
+        self.bounds = (0, 0, 0, 0)
+        if n:
+            self.bounds = (self.left.min(), self.top.min(), self.right.max(), self.bottom.max())
+        self.alive = np.ones(n, dtype=bool)
+        self.hit_count = np.zeros(n, dtype=np.int64)
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+
+        # Uniform grid as a dense (rows, cols, depth) table of brick indices, -1 = empty
+        if n:
+            x0 = (self.left // cell_width).astype(np.int64)
+            x1 = ((self.right - 1) // cell_width).astype(np.int64)
+            y0 = (self.top // cell_height).astype(np.int64)
+            y1 = ((self.bottom - 1) // cell_height).astype(np.int64)
+            cols, rows = int(x1.max()) + 1, int(y1.max()) + 1
+        else:
+            cols = rows = 1
+        counts = np.zeros((rows, cols), dtype=np.int64)
+        entries = []
+        for i in range(n):
+            for cy in range(max(0, y0[i]), y1[i] + 1):
+                for cx in range(max(0, x0[i]), x1[i] + 1):
+                    entries.append((cy, cx, counts[cy, cx], i))
+                    counts[cy, cx] += 1
+        self.cells = np.full((rows, cols, max(1, int(counts.max()))), -1, dtype=np.int64)
+        for cy, cx, k, i in entries:
+            self.cells[cy, cx, k] = i
+
+    def remove(self, brick):
+        i = self.index.get(id(brick))
+        if i is not None:
+            self.alive[i] = False
+
+
+class BallSystem:
+    """Up to `capacity` balls of one size stored as arrays; balls [0, count) are live."""
+    def __init__(self, capacity, size):
+        self.capacity = capacity
+        self.size = size
+        self.pos = np.zeros((capacity, 2), dtype=np.float64)
+        self.vel = np.zeros((capacity, 2), dtype=np.float64)
+        self.count = 0
+
+    def spawn(self, x, y, dx, dy):
+        """Add balls at (x, y) with velocities (dx, dy); scalars or arrays. Extra balls past capacity are dropped."""
+        dx, dy = np.atleast_1d(dx), np.atleast_1d(dy)
+        n = min(len(dx), self.capacity - self.count)
+        live = slice(self.count, self.count + n)
+        self.pos[live, 0] = x
+        self.pos[live, 1] = y
+        self.vel[live, 0] = dx[:n]
+        self.vel[live, 1] = dy[:n]
+        self.count += n
+        return n
+
+    def step(self, field, paddle_rect, width, height):
+        """Advance every ball one tick.
+
+        Returns (brick_indices, hits, paddle_hits, lost): the field indices of
+        the bricks hit this tick with how many balls hit each, the number of
+        paddle bounces and the number of balls that fell out and were removed.
+        """
+        n = self.count
+        size = self.size
+        pos = self.pos[:n]
+        vel = self.vel[:n]
+        pos += vel
+
+        # Walls
+        left = pos[:, 0] <= 0
+        right = pos[:, 0] + size >= width
+        vel[left, 0] = np.abs(vel[left, 0])
+        vel[right, 0] = -np.abs(vel[right, 0])
+        pos[left, 0] = 1
+        pos[right, 0] = width - 1 - size
+        top = pos[:, 1] <= 0
+        vel[top, 1] = np.abs(vel[top, 1])
+        pos[top, 1] = 1
+
+        # Paddle: bounce angle from where the ball lands on it
+        on_paddle = ((pos[:, 0] < paddle_rect.right) & (pos[:, 0] + size > paddle_rect.left) &
+                     (pos[:, 1] < paddle_rect.bottom) & (pos[:, 1] + size > paddle_rect.top) &
+                     (vel[:, 1] > 0))
+        if on_paddle.any():
+            centerx = pos[on_paddle, 0] + size // 2
+            vel[on_paddle, 0] = (centerx - paddle_rect.centerx) / (paddle_rect.width / 2) * 6
+            vel[on_paddle, 1] *= -1
+            pos[on_paddle, 1] = paddle_rect.top - 1 - size
+
+        brick_indices, hits = self._collide_bricks(field, pos, vel)
+
+        # Balls below the screen are removed by compacting the live range
+        lost = pos[:, 1] > height
+        lost_count = int(lost.sum())
+        if lost_count:
+            keep = ~lost
+            self.count = n - lost_count
+            self.pos[:self.count] = pos[keep]
+            self.vel[:self.count] = vel[keep]
+        return brick_indices, hits, int(on_paddle.sum()), lost_count
+
+    def _collide_bricks(self, field, pos, vel):
+        empty = np.zeros(0, dtype=np.int64)
+        size = self.size
+        # Broad phase: only balls inside the field's bounding box go any further
+        near = np.flatnonzero((pos[:, 0] < field.bounds[2]) & (pos[:, 0] + size > field.bounds[0]) &
+                              (pos[:, 1] < field.bounds[3]) & (pos[:, 1] + size > field.bounds[1]))
+        if not len(near):
+            return empty, empty
+        rows, cols, depth = field.cells.shape
+        left = pos[near, 0]
+        top = pos[near, 1]
+
+        # Candidates: the bricks in the (up to) four cells each ball's box touches
+        ix = np.floor(left).astype(np.int64)
+        iy = np.floor(top).astype(np.int64)
+        cx = np.stack([ix // field.cell_width, (ix + size - 1) // field.cell_width] * 2, axis=1)
+        cy = np.repeat(np.stack([iy // field.cell_height, (iy + size - 1) // field.cell_height], axis=1), 2, axis=1)
+        inside = (cx >= 0) & (cx < cols) & (cy >= 0) & (cy < rows)
+        flat = np.where(inside, cy * cols + cx, 0)
+        cand = field.cells.reshape(rows * cols, depth)[flat]
+        cand[~inside] = -1
+        cand = cand.reshape(len(near), 4 * depth)
+        safe = np.maximum(cand, 0)
+        valid = (cand >= 0) & field.alive[safe]
+
+        # Overlap test against the candidate rects (same as Rect.colliderect)
+        r_left = field.left[safe]
+        r_top = field.top[safe]
+        r_right = field.right[safe]
+        r_bottom = field.bottom[safe]
+        left_ = left[:, None]
+        top_ = top[:, None]
+        overlap = (valid & (left_ < r_right) & (left_ + size > r_left) &
+                   (top_ < r_bottom) & (top_ + size > r_top))
+        hit = np.flatnonzero(overlap.any(axis=1))
+        if not len(hit):
+            return empty, empty
+
+        # Each ball resolves against its top-left overlapping brick
+        key = np.where(overlap[hit], r_top[hit] * 1e6 + r_left[hit], np.inf)
+        bricks = cand[hit, key.argmin(axis=1)]
+        bl = left[hit]
+        bt = top[hit]
+        dx1 = np.abs(bl + size - field.left[bricks])
+        dx2 = np.abs(bl - field.right[bricks])
+        dy1 = np.abs(bt + size - field.top[bricks])
+        dy2 = np.abs(bt - field.bottom[bricks])
+        side = np.minimum(dx1, dx2) <= np.minimum(dy1, dy2)
+        balls = near[hit]
+        vel[balls[side], 0] *= -1
+        vel[balls[~side], 1] *= -1
+
+        brick_indices, hits = np.unique(bricks, return_counts=True)
+        field.hit_count[brick_indices] += hits
+        return brick_indices, hits
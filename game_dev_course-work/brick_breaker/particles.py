@@ -0,0 +1,150 @@
+"""Pooled shatter particles for destroyed bricks.
+
+All particles live in preallocated NumPy arrays used as a ring buffer: a
+broken brick writes its particles at the head, and because every particle
+lives exactly LIFETIME ticks the live ones are always one contiguous (possibly
+wrapping) run of slots, so expiring them just moves the tail. When the pool is
+full new particles overwrite the oldest, which caps the per-frame cost.
+Emitting, updating and expiring allocate no arrays: velocities and start
+offsets are copied out of tables made once up front, and the physics step
+works in place on array slices. Drawing writes all particles straight into the
+surface's pixels in a few array assignments instead of blitting each one.
+
+Particles are only a visual effect; they never touch the game state or its RNG.
+"""
+import numpy as np
+import pygame
+
+# Most particles alive at once
+PARTICLE_CAPACITY = 30000
+PARTICLES_PER_BRICK = 40
+# Ticks every particle lives, and the number of alpha steps it fades through
+LIFETIME = 45
+FADE_LEVELS = 8
+GRAVITY = 0.15
+PARTICLE_SIZE = 2
+# Entries in the precomputed velocity and offset tables
+TABLE_SIZE = 4096
+
+
+class ParticleSystem:
+    """A fixed-capacity pool of particles drawn as small squares in the brick colours.
+
+    Particles fade from their colour to `background` over their lifetime.
+    """
+    def __init__(self, colors, background, capacity=PARTICLE_CAPACITY, seed=0):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.born = np.zeros(capacity, dtype=np.int64)
+        self.color = np.zeros(capacity, dtype=np.int64)
+        # Scratch arrays for drawing: sprite index and integer position per slot
+        self.sprite_index = np.zeros(capacity, dtype=np.int64)
+        self.ipos = np.zeros((capacity, 2), dtype=np.int64)
+        self.tail = 0      # oldest live slot
+        self.count = 0     # live particles, from tail onwards (wrapping)
+        self.tick = 0
+
+        # Outward bursts with a slight upward kick, and start points as fractions of the brick
+        rng = np.random.default_rng(seed)
+        angle = rng.uniform(0, 2 * np.pi, TABLE_SIZE)
+        speed = rng.uniform(0.5, 4.0, TABLE_SIZE)
+        self.velocity_table = np.stack([np.cos(angle) * speed, np.sin(angle) * speed - 1.5], axis=1).astype(np.float32)
+        self.offset_table = rng.uniform(0, 1, (TABLE_SIZE, 2)).astype(np.float32)
+        self.table_pos = 0
+
+        # One shade per (fade level, colour), blending towards the background with age
+        self.colors = len(colors)
+        self.shades = []
+        for level in range(FADE_LEVELS):
+            for color in colors:
+                self.shades.append(tuple(c + (b - c) * level // FADE_LEVELS for c, b in zip(color[:3], background)))
+
+    def segments(self, start, count):
+        """The slot slices covering `count` slots from `start`, split where the ring wraps."""
+        end = start + count
+        if end <= self.capacity:
+            return [slice(start, end)] if count else []
+        return [slice(start, self.capacity), slice(0, end - self.capacity)]
+
+    def emit(self, rect, color_index, count=PARTICLES_PER_BRICK):
+        """Burst `count` particles of colour `color_index` out of `rect`."""
+        count = min(count, self.capacity, TABLE_SIZE)
+        head = (self.tail + self.count) % self.capacity
+        # A full pool drops its oldest particles to make room
+        overflow = self.count + count - self.capacity
+        if overflow > 0:
+            self.tail = (self.tail + overflow) % self.capacity
+            self.count -= overflow
+        done = 0
+        for part in self.segments(head, count):
+            n = part.stop - part.start
+            t = self.table_pos
+            if t + n > TABLE_SIZE:
+                t = 0
+            self.table_pos = t + n
+            self.vel[part] = self.velocity_table[t:t + n]
+            pos = self.pos[part]
+            pos[:] = self.offset_table[t:t + n]
+            pos[:, 0] *= rect.width
+            pos[:, 0] += rect.x
+            pos[:, 1] *= rect.height
+            pos[:, 1] += rect.y
+            self.born[part] = self.tick
+            self.color[part] = color_index
+            done += n
+        self.count += done
+
+    def update(self):
+        """One tick: expire the particles that reached LIFETIME, then move the rest."""
+        self.tick += 1
+        if not self.count:
+            return
+        # Birth ticks only grow from tail to head, so the expired ones are a prefix
+        oldest_allowed = self.tick - LIFETIME
+        for part in self.segments(self.tail, self.count):
+            expired = int(np.searchsorted(self.born[part], oldest_allowed, side='right'))
+            self.tail = (self.tail + expired) % self.capacity
+            self.count -= expired
+            if expired < part.stop - part.start:
+                break
+        for part in self.segments(self.tail, self.count):
+            vel = self.vel[part]
+            vel[:, 1] += GRAVITY
+            self.pos[part] += vel
+
+    def draw(self, surface):
+        """Draw every live particle; returns [bounding rect] of what was drawn, or []."""
+        if not self.count:
+            return []
+        width, height = surface.get_size()
+        mapped = np.array([surface.map_rgb(shade) for shade in self.shades], dtype=np.uint32)
+        pixels = pygame.surfarray.pixels2d(surface)
+        bounds = []
+        try:
+            for part in self.segments(self.tail, self.count):
+                index = self.sprite_index[part]
+                # Fade level from age, then shade = level * colours + colour
+                np.subtract(self.tick, self.born[part], out=index)
+                index *= FADE_LEVELS
+                index //= LIFETIME
+                np.minimum(index, FADE_LEVELS - 1, out=index)
+                index *= self.colors
+                index += self.color[part]
+                ipos = self.ipos[part]
+                np.copyto(ipos, self.pos[part], casting='unsafe')
+                x, y = ipos[:, 0], ipos[:, 1]
+                visible = (x >= 0) & (x <= width - PARTICLE_SIZE) & (y >= 0) & (y <= height - PARTICLE_SIZE)
+                if not visible.any():
+                    continue
+                x, y, shade = x[visible], y[visible], mapped[index[visible]]
+                for dx in range(PARTICLE_SIZE):
+                    for dy in range(PARTICLE_SIZE):
+                        pixels[x + dx, y + dy] = shade
+                bounds.append(pygame.Rect(int(x.min()), int(y.min()), int(x.max() - x.min()) + PARTICLE_SIZE,
+                                          int(y.max() - y.min()) + PARTICLE_SIZE))
+        finally:
+            del pixels
+        if not bounds:
+            return []
+        return [bounds[0].unionall(bounds[1:])]
@@ -0,0 +1,214 @@
+"""Deterministic replays for the brick breaker.
+
+A replay is the game's RNG seed plus the input of every physics tick, stored
+as a compact run-length encoded binary stream. Because Game.tick is the only
+thing that advances the simulation and all its randomness comes from the
+seeded Game.rng, re-running the inputs through a headless Game reproduces the
+session exactly. The final score and a hash of the final state are kept in
+the header so playback can check it ended in the same place.
+
+    python replay.py play replays/*.bbr
+    python replay.py record --games 20 --out replays/ci
+"""
+import os
+import sys
+import time
+import struct
+import hashlib
+import argparse
+
+# Input bits of one tick
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_SPACE = 4
+INPUT_MULTIBALL = 8
+INPUT_STRESS = 16
+
+# Header flags
+FLAG_SWEPT = 1
+FLAG_ENDLESS = 2
+
+MAGIC = b'BBRP'
+# 2: games go on into generated levels after the level files
+# 3: generated levels have explosive bricks
+VERSION = 3
+# magic, version, flags, seed, ticks, final score, final state hash
+HEADER = struct.Struct('<4sBBIII8s')
+
+
+def state_hash(game):
+    """8-byte digest of the simulation state (not of the screen or menus)."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(struct.pack('<qiiiii', game.score, game.lives, game.level, game.bricks_broken,
+                         game.total_bricks, game.paddle.rect.x))
+    ball = game.ball
+    h.update(struct.pack('<dddd', ball.x, ball.y, ball.dx, ball.dy))
+    for brick in sorted(game.bricks, key=lambda b: (b.rect.y, b.rect.x)):
+        h.update(struct.pack('<iiii', brick.rect.x, brick.rect.y, brick.color_index, brick.hits))
+    return h.digest()
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class ReplayRecorder:
+    """Collects the per-tick input of one session as (input, run length) pairs."""
+    def __init__(self, seed, flags=0):
+        self.seed = seed
+        self.flags = flags
+        self.runs = []
+        self.ticks = 0
+
+    def record(self, inputs):
+        if self.runs and self.runs[-1][0] == inputs:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([inputs, 1])
+        self.ticks += 1
+
+    def truncate(self, ticks):
+        """Forget the input recorded after the first `ticks` ticks (e.g. after a rewind)."""
+        excess = self.ticks - ticks
+        while excess > 0:
+            run = self.runs[-1]
+            if run[1] <= excess:
+                excess -= run[1]
+                self.runs.pop()
+            else:
+                run[1] -= excess
+                excess = 0
+        self.ticks = min(self.ticks, ticks)
+
+    def encode(self, game):
+        body = bytearray()
+        for inputs, count in self.runs:
+            body.append(inputs)
+            _write_varint(body, count)
+        header = HEADER.pack(MAGIC, VERSION, self.flags, self.seed, self.ticks,
+                             game.score, state_hash(game))
+        return header + bytes(body)
+
+    def save(self, path, game):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(self.encode(game))
+
+
+class Replay:
+    """A decoded replay file."""
+    def __init__(self, data):
+        magic, version, self.flags, self.seed, self.ticks, self.score, self.hash = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a brick breaker replay (or an unsupported version)')
+        self.runs = []
+        pos = HEADER.size
+        while pos < len(data):
+            inputs = data[pos]
+            count, pos = _read_varint(data, pos + 1)
+            self.runs.append((inputs, count))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+
+def play(replay):
+    """Re-run a replay on a headless game as fast as possible.
+
+    Returns (game, matched) where matched says whether the final score and
+    state hash are the ones recorded.
+    """
+    import brick_breaker as bb
+
+    game = bb.Game(headless=True, seed=replay.seed)
+    game.swept_collisions = bool(replay.flags & FLAG_SWEPT)
+    if replay.flags & FLAG_ENDLESS:
+        game.reset_game(replay.seed, endless_mode=True)
+    game.state = bb.STATE_READY
+    for inputs, count in replay.runs:
+        for _ in range(count):
+            game.tick_input(inputs)
+    matched = game.score == replay.score and state_hash(game) == replay.hash
+    return game, matched
+
+
+def record_games(games, out_dir, seed=0, max_ticks=None):
+    """Record auto-paddle headless games into a replay corpus."""
+    import brick_breaker as bb
+    import headless
+
+    max_ticks = max_ticks or headless.MAX_TICKS
+    for i in range(games):
+        game = bb.Game(headless=True, seed=seed + i)
+        game.recorder = ReplayRecorder(game.seed, FLAG_SWEPT if game.swept_collisions else 0)
+        paddle = headless.AutoPaddle(seed + i)
+        game.state = bb.STATE_READY
+        for _ in range(max_ticks):
+            if game.state == bb.STATE_GAME_OVER:
+                break
+            left, right = paddle(game)
+            space = game.state in (bb.STATE_READY, bb.STATE_LEVEL_COMPLETE)
+            game.tick(left, right, space)
+        path = os.path.join(out_dir, f'game_{seed + i:06d}.bbr')
+        game.recorder.save(path, game)
+        print(f'{path}: {game.recorder.ticks} ticks, score {game.score}, '
+              f'{os.path.getsize(path)} bytes')
+
+
+def main(argv=None):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+    parser = argparse.ArgumentParser(description='Play back or record brick breaker replays.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('play', help='re-run replays headless and check their final state')
+    p.add_argument('paths', nargs='+')
+    p = sub.add_parser('record', help='record auto-paddle games as replays')
+    p.add_argument('--games', type=int, default=10)
+    p.add_argument('--out', default='replays')
+    p.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        record_games(args.games, args.out, args.seed)
+        return 0
+
+    import brick_breaker as bb
+
+    failures = 0
+    total_ticks = 0
+    start = time.perf_counter()
+    for path in args.paths:
+        replay = Replay.load(path)
+        game, matched = play(replay)
+        total_ticks += replay.ticks
+        failures += not matched
+        print(f"{path}: {'ok' if matched else 'MISMATCH'} ({replay.ticks} ticks, "
+              f"score {game.score}, recorded {replay.score})")
+    elapsed = time.perf_counter() - start
+    print(f'{len(args.paths)} replays, {failures} mismatched, {total_ticks / elapsed:,.0f} ticks/s '
+          f'({total_ticks / elapsed / bb.TICK_RATE:.0f}x real time)')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
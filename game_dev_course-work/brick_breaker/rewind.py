@@ -0,0 +1,147 @@
+"""Rewind for the brick breaker: a ring buffer of per-tick state snapshots.
+
+Every tick Rewind.capture() packs the game's scalar state (score, lives,
+level, state, paddle, ball position and velocity, replay length) into one
+fixed-size FRAME record in a preallocated ring. Bricks are delta encoded:
+hit_brick logs each brick's hit count before the hit into an undo log, and a
+frame only stores how long the log was. Restoring a frame undoes the log back
+to that length, so a restore costs as much as the hits since then, not as
+much as the bricks in the level.
+
+The RNG state is kept too (only when it changed since the previous tick), and
+a restore cuts the game's replay back to the same tick, so play continued
+after a rewind still replays exactly. Extra multi-ball balls are not part of a
+snapshot and are dropped on restore. A new level empties the ring, so rewinds
+stay within the current level.
+"""
+import struct
+from array import array
+
+# Seconds of play kept
+REWIND_SECONDS = 10
+
+# score, lives, level, bricks broken, total bricks, state, paddle x, ball x, y, dx, dy,
+# speed-up counter, undo log length, RNG state id, replay ticks
+FRAME = struct.Struct('<qiiiiBhddddhQII')
+# brick index in the level, hit count before the hit
+BRICK_ENTRY = struct.Struct('<Ib')
+
+
+def pack_rng_state(state):
+    version, internal, gauss = state
+    return version, array('I', internal), gauss
+
+
+def unpack_rng_state(packed):
+    version, internal, gauss = packed
+    return version, tuple(internal), gauss
+
+
+class Rewind:
+    """The last `capacity` ticks of one game."""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.frames = bytearray(capacity * FRAME.size)
+        self.first = 0    # number of the oldest frame kept
+        self.count = 0
+        self.log = bytearray()
+        self.log_base = 0  # absolute log position of log[0]
+        self.rng_states = {}
+        self.rng_id = 0
+        self.last_rng_state = None
+
+    def reset(self):
+        self.first = self.count = 0
+        self.log.clear()
+        self.log_base = 0
+        self.rng_states.clear()
+        self.last_rng_state = None
+
+    def memory_bytes(self):
+        """Rough current memory use: frames, undo log and kept RNG states."""
+        return len(self.frames) + len(self.log) + len(self.rng_states) * 2500
+
+    def note_hit(self, brick):
+        """Log `brick`'s hit count before a hit so restores can undo it."""
+        if brick.index < 0:
+            # Not a level brick, so it cannot be put back: start over from here
+            self.reset()
+            return
+        self.log += BRICK_ENTRY.pack(brick.index, brick.hits)
+
+    def capture(self, game):
+        state = game.rng.getstate()
+        if state != self.last_rng_state:
+            self.last_rng_state = state
+            self.rng_id += 1
+            self.rng_states[self.rng_id] = pack_rng_state(state)
+        if self.count == self.capacity:
+            self.drop_oldest()
+        ball = game.ball
+        recorder = game.recorder
+        slot = (self.first + self.count) % self.capacity
+        FRAME.pack_into(self.frames, slot * FRAME.size, game.score, game.lives, game.level, game.bricks_broken,
+                        game.total_bricks, game.state, game.paddle.rect.x, ball.x, ball.y, ball.dx, ball.dy,
+                        ball.speed_increase_counter, self.log_base + len(self.log), self.rng_id,
+                        recorder.ticks if recorder is not None else 0)
+        self.count += 1
+
+    def drop_oldest(self):
+        self.first += 1
+        self.count -= 1
+        oldest = FRAME.unpack_from(self.frames, (self.first % self.capacity) * FRAME.size)
+        # Undo entries and RNG states older than every kept frame are no longer needed
+        unused = oldest[12] - self.log_base
+        if unused > 4096:
+            del self.log[:unused]
+            self.log_base += unused
+        for rng_id in [i for i in self.rng_states if i < oldest[13]]:
+            del self.rng_states[rng_id]
+
+    def step_back(self, game):
+        """Rewind `game` by one tick; returns False when there is nothing older."""
+        if self.count < 2:
+            return False
+        self.count -= 1
+        self.restore(game, self.first + self.count - 1)
+        return True
+
+    def restore(self, game, number):
+        (score, lives, level, bricks_broken, total_bricks, state, paddle_x, x, y, dx, dy,
+         counter, log_length, rng_id, ticks) = FRAME.unpack_from(self.frames, (number % self.capacity) * FRAME.size)
+
+        # Undo brick hits newer than the frame, newest first
+        log = self.log
+        end = len(log)
+        stop = log_length - self.log_base
+        while end > stop:
+            end -= BRICK_ENTRY.size
+            index, hits = BRICK_ENTRY.unpack_from(log, end)
+            brick = game.level_bricks[index]
+            if brick.slot == -1:
+                game.add_brick(brick)
+            brick.hits = hits
+            game.brick_version += 1
+            game.renderer.invalidate(brick.rect)
+        if end < len(log):
+            game.layout_version += 1
+            # Chain-reaction bursts still to come may be over bricks that are back
+            game.effects.clear()
+        del log[stop:]
+
+        game.score, game.lives, game.level = score, lives, level
+        game.bricks_broken, game.total_bricks, game.state = bricks_broken, total_bricks, state
+        game.paddle.rect.x = paddle_x
+        game.paddle.prev_x = paddle_x
+        ball = game.ball
+        ball.place(x, y)
+        ball.snap()
+        ball.dx, ball.dy = dx, dy
+        ball.speed_increase_counter = counter
+        game.rng.setstate(unpack_rng_state(self.rng_states[rng_id]))
+        self.last_rng_state = None
+        # Extra balls are not kept, and the brick arrays they use may now be stale
+        game.multiball = None
+        game.brick_field = None
+        if game.recorder is not None:
+            game.recorder.truncate(ticks)
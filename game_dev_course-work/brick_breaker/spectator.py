@@ -0,0 +1,545 @@
+"""Live spectating of a brick breaker game over the network.
+
+The game feeds a BroadcastServer once per tick (Game.tick_input). The server
+turns the game state into one binary message, on the game thread, and hands
+it to an asyncio event loop on its own thread. That loop sends it to every
+spectator. A message is one of two kinds:
+
+- a keyframe: the whole state, every brick included. One is sent when a
+  spectator joins or falls behind, when the brick layout changes other than
+  by hits (a new level, a rewind), and every KEYFRAME_INTERVAL ticks;
+- a delta: score, lives, level, state, paddle and ball positions, how far the
+  endless field has scrolled, the bricks added (an endless row coming in),
+  plus the ID and hits left of each brick hit or removed since the last
+  message. It is about 30 bytes on most ticks.
+
+Each spectator has its own queue of at most CLIENT_QUEUE_SIZE messages. A
+spectator that cannot keep up has its queue emptied and gets the next keyframe
+instead, so the game loop never waits on a slow spectator and the others
+never wait on it either. The server counts the bytes sent to each spectator; summary() reports
+bandwidth per spectator.
+
+Messages are a 4-byte little-endian length followed by the payload. Run from
+this folder:
+
+    python brick_breaker.py --spectators            # play, and accept spectators on SPECTATOR_PORT
+    python spectator.py watch HOST                  # watch a game
+    python spectator.py loopback --clients 100      # 100 spectators of an autopilot game on this machine
+    python spectator.py loopback --endless          # the same with an endless game
+"""
+import os
+import sys
+import time
+import struct
+import socket
+import asyncio
+import argparse
+import threading
+import multiprocessing as mp
+
+SPECTATOR_PORT = 5077
+# Messages waiting per spectator before it is dropped back to waiting for a keyframe (2 s of ticks)
+CLIENT_QUEUE_SIZE = 120
+# Ticks between keyframes when nothing else asks for one
+KEYFRAME_INTERVAL = 300
+# Seconds into a loopback test that its slow spectators stop reading
+STALL_AFTER = 5.0
+# Bytes a spectator's connection (and its socket) may buffer before its queue starts to fill
+WRITE_BUFFER = 4096
+
+LENGTH = struct.Struct('<I')
+# kind, tick, score, lives, level, state, paddle x, ball x, ball y, then a brick or hit count
+KEYFRAME = struct.Struct('<cIiBHBhffI')
+# ... then pixels scrolled, bricks added (sent as BRICK records before the hits) and bricks hit
+DELTA = struct.Struct('<cIiBHBhffhHH')
+# id, x, y, width, height, colour, hits left
+BRICK = struct.Struct('<Ihhhhbb')
+# id, hits left (0 = destroyed or gone)
+HIT = struct.Struct('<IB')
+
+
+def _header(kind, tick, game, *counts):
+    ball = game.ball
+    return (kind, tick & 0xFFFFFFFF, game.score, max(0, game.lives), game.level, game.state, game.paddle.rect.x,
+            ball.x, ball.y, *counts)
+
+
+class Spectator:
+    """Server-side connection of one spectator."""
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.synced = False
+        self.closing = False
+        self.connected = time.perf_counter()
+        self.disconnected = None
+        self.bytes_sent = self.messages = self.dropped = self.resyncs = 0
+
+    def bandwidth(self):
+        """Average bytes per second sent to this spectator so far."""
+        end = self.disconnected or time.perf_counter()
+        return self.bytes_sent / max(1e-9, end - self.connected)
+
+
+class BroadcastServer:
+    """Accepts spectators on `host`:`port` (0 picks a free port) and streams what feed() is given."""
+    def __init__(self, host='0.0.0.0', port=SPECTATOR_PORT, queue_size=CLIENT_QUEUE_SIZE,
+                 keyframe_interval=KEYFRAME_INTERVAL):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.keyframe_interval = keyframe_interval
+        self.loop = asyncio.new_event_loop()
+        self.thread = None
+        self.server = None
+        self.ready = threading.Event()
+        self.error = None
+        # Owned by the event loop thread; the game thread only reads them
+        self.spectators = set()
+        self.finished = []
+        self.want_keyframe = False
+        # Owned by the game thread
+        self.tick = 0
+        self.hits = []
+        self.added = []
+        self.ids = {}
+        self.next_id = 0
+        self.layout_version = None
+        self.scroll_offset = 0
+        self.last_keyframe = 0
+        self.keyframes = self.deltas = self.fed = 0
+        self.feed_time = 0.0
+
+    # Game thread
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='spectators', daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def note_hit(self, brick):
+        """`brick` was hit or taken out of the game other than by a layout change."""
+        if self.spectators:
+            self.hits.append(brick)
+
+    def note_added(self, brick):
+        """`brick` came into the game other than by a layout change (an endless row)."""
+        if self.spectators:
+            self.added.append(brick)
+
+    def feed(self, game):
+        """Send this tick's state to every spectator; costs next to nothing when there are none."""
+        self.tick += 1
+        if not self.spectators:
+            self.hits.clear()
+            self.added.clear()
+            self.layout_version = None
+            return
+        start = time.perf_counter()
+        # A brick hit twice in a tick is sent once
+        hits = list(dict.fromkeys(self.hits))
+        self.hits.clear()
+        added = [brick for brick in self.added if brick not in self.ids]
+        self.added.clear()
+        for brick in added:
+            self.ids[brick] = self.next_id
+            self.next_id += 1
+        if (game.layout_version != self.layout_version or self.tick - self.last_keyframe >= self.keyframe_interval
+                or any(brick not in self.ids for brick in hits)):
+            self.layout_version = game.layout_version
+            self.last_keyframe = self.tick
+            delta, keyframe = None, self.keyframe(game)
+            self.keyframes += 1
+        elif self.want_keyframe:
+            # Only the spectators waiting for a keyframe get one; brick IDs are stable, so the rest keep up on the delta
+            delta, keyframe = self.delta(game, hits, added), self.keyframe(game)
+            self.keyframes += 1
+            self.deltas += 1
+        else:
+            delta, keyframe = self.delta(game, hits, added), None
+            self.deltas += 1
+        self.loop.call_soon_threadsafe(self._fan_out, delta, keyframe)
+        self.fed += 1
+        self.feed_time += time.perf_counter() - start
+
+    def keyframe(self, game):
+        # A brick keeps its ID for as long as it is in the game
+        ids = {}
+        old_ids = self.ids
+        for brick in game.bricks:
+            number = old_ids.get(brick)
+            if number is None:
+                number = self.next_id
+                self.next_id += 1
+            ids[brick] = number
+        self.ids = ids
+        self.scroll_offset = game.scroll_offset
+        payload = bytearray(KEYFRAME.pack(*_header(b'K', self.tick, game, len(ids))))
+        for brick, number in ids.items():
+            rect = brick.rect
+            payload += BRICK.pack(number, rect.x, rect.y, rect.width, rect.height, brick.color_index,
+                                  brick.hits_required - brick.hits)
+        return LENGTH.pack(len(payload)) + payload
+
+    def delta(self, game, hits, added):
+        ids = self.ids
+        scrolled = game.scroll_offset - self.scroll_offset
+        self.scroll_offset = game.scroll_offset
+        payload = bytearray(DELTA.pack(*_header(b'D', self.tick, game, scrolled, len(added), len(hits))))
+        # Added bricks are where they are now, so spectators place them after scrolling
+        for brick in added:
+            rect = brick.rect
+            payload += BRICK.pack(ids[brick], rect.x, rect.y, rect.width, rect.height, brick.color_index,
+                                  brick.hits_required - brick.hits)
+        for brick in hits:
+            # A brick out of the game (destroyed, or an endless row gone past) has none left
+            hits_left = max(0, brick.hits_required - brick.hits) if brick.slot != -1 else 0
+            payload += HIT.pack(ids[brick], hits_left)
+        return LENGTH.pack(len(payload)) + payload
+
+    def close(self, timeout=2.0):
+        """Stop accepting, give spectators `timeout` seconds to receive what is queued, and disconnect them."""
+        if self.thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self.loop)
+        try:
+            future.result(timeout + 5)
+        except Exception as e:
+            print(f"Warning: spectator server did not shut down cleanly: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.thread = None
+
+    def stats(self):
+        """(spectator, bytes per second) for every spectator, connected or gone."""
+        return [(s, s.bandwidth()) for s in list(self.spectators) + self.finished]
+
+    def summary(self):
+        stats = self.stats()
+        rates = [rate for _, rate in stats]
+        feed = self.feed_time / max(1, self.fed) * 1e6
+        text = f"{len(stats)} spectators, {self.keyframes} keyframes, {self.deltas} deltas, feed {feed:.0f} us/tick"
+        if rates:
+            text += (f"; per spectator {min(rates) / 1024:.2f}-{max(rates) / 1024:.2f} KB/s "
+                     f"(mean {sum(rates) / len(rates) / 1024:.2f}), "
+                     f"{sum(s.dropped for s, _ in stats)} messages dropped, {sum(s.resyncs for s, _ in stats)} resyncs")
+        return text
+
+    # Event loop thread
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._serve, self.host, self.port))
+            self.port = self.server.sockets[0].getsockname()[1]
+        except OSError as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _serve(self, reader, writer):
+        spectator = Spectator(writer, self.queue_size)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, WRITE_BUFFER)
+        # Keep the backlog in the queue, where it is counted and dropped, not in buffers further down
+        writer.transport.set_write_buffer_limits(WRITE_BUFFER)
+        self.spectators.add(spectator)
+        self.want_keyframe = True
+        queue = spectator.queue
+        try:
+            while not spectator.closing or not queue.empty():
+                messages = [await queue.get()]
+                # Whatever queued up meanwhile goes out in the same write
+                while not queue.empty():
+                    messages.append(queue.get_nowait())
+                data = b''.join(m for m in messages if m is not None)
+                writer.write(data)
+                await writer.drain()
+                spectator.bytes_sent += len(data)
+                spectator.messages += len(messages) - (None in messages)
+                if None in messages:
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            spectator.disconnected = time.perf_counter()
+            self.spectators.discard(spectator)
+            self.finished.append(spectator)
+            writer.close()
+
+    def _fan_out(self, delta, keyframe):
+        """Queue a tick's message: the delta for spectators in sync (when there is one), else the keyframe."""
+        for spectator in self.spectators:
+            if delta is not None and spectator.synced:
+                self._send(spectator, delta, False)
+            elif keyframe is not None:
+                self._send(spectator, keyframe, True)
+        self.want_keyframe = any(not s.synced for s in self.spectators)
+
+    def _send(self, spectator, message, keyframe):
+        """Queue `message`; a spectator whose queue is full loses what is queued and waits for a keyframe."""
+        queue = spectator.queue
+        if queue.full():
+            while not queue.empty():
+                queue.get_nowait()
+                spectator.dropped += 1
+            spectator.resyncs += 1
+            if not keyframe:
+                spectator.dropped += 1
+                spectator.synced = False
+                return
+        queue.put_nowait(message)
+        spectator.synced = True
+
+    async def _shutdown(self, timeout):
+        self.server.close()
+        deadline = time.perf_counter() + timeout
+        for spectator in list(self.spectators):
+            # A full queue has no room for the end marker; the writer stops once it is empty instead
+            spectator.closing = True
+            if not spectator.queue.full():
+                spectator.queue.put_nowait(None)
+        while self.spectators and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        for spectator in list(self.spectators):
+            spectator.writer.close()
+
+
+class SpectatorView:
+    """A spectator's copy of the game, kept up to date from the messages."""
+    def __init__(self):
+        self.synced = False
+        self.tick = self.score = self.lives = self.level = self.state = 0
+        self.paddle_x = 0
+        self.ball = (0.0, 0.0)
+        # id -> [x, y, width, height, colour, hits left]
+        self.bricks = {}
+        self.keyframes = self.deltas = 0
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add received bytes; applies every complete message among them."""
+        self.buffer += data
+        pos = 0
+        buffer = self.buffer
+        while len(buffer) - pos >= LENGTH.size:
+            (length,) = LENGTH.unpack_from(buffer, pos)
+            if len(buffer) - pos - LENGTH.size < length:
+                break
+            self.apply(memoryview(buffer)[pos + LENGTH.size:pos + LENGTH.size + length])
+            pos += LENGTH.size + length
+        del buffer[:pos]
+
+    def apply(self, payload):
+        if not payload:
+            return
+        kind = bytes(payload[:1])
+        if kind == b'K':
+            (_, self.tick, self.score, self.lives, self.level, self.state, self.paddle_x, x, y,
+             count) = KEYFRAME.unpack_from(payload)
+            self.ball = (x, y)
+            self.bricks = {i: [bx, by, w, h, color, hits]
+                           for i, bx, by, w, h, color, hits in BRICK.iter_unpack(payload[KEYFRAME.size:])}
+            self.synced = True
+            self.keyframes += 1
+        elif kind == b'D' and self.synced:
+            (_, self.tick, self.score, self.lives, self.level, self.state, self.paddle_x, x, y,
+             scrolled, added, count) = DELTA.unpack_from(payload)
+            self.ball = (x, y)
+            if scrolled:
+                for brick in self.bricks.values():
+                    brick[1] += scrolled
+            start = DELTA.size + added * BRICK.size
+            for i, bx, by, w, h, color, hits in BRICK.iter_unpack(payload[DELTA.size:start]):
+                self.bricks[i] = [bx, by, w, h, color, hits]
+            for i, hits in HIT.iter_unpack(payload[start:start + count * HIT.size]):
+                if hits:
+                    self.bricks[i][5] = hits
+                else:
+                    self.bricks.pop(i, None)
+            self.deltas += 1
+
+    def digest(self):
+        """What the spectator should agree with the game on (see game_digest)."""
+        return (self.score, self.lives, self.level,
+                sorted((x, y, color, hits) for x, y, _, _, color, hits in self.bricks.values()))
+
+
+def game_digest(game):
+    return (game.score, max(0, game.lives), game.level,
+            sorted((b.rect.x, b.rect.y, b.color_index, b.hits_required - b.hits) for b in game.bricks))
+
+
+def watch(host, port):
+    """Window that shows the game streamed from `host`."""
+    import pygame
+    import brick_breaker as bb
+
+    sock = socket.create_connection((host, port))
+    sock.setblocking(False)
+    view = SpectatorView()
+    screen = pygame.display.set_mode((bb.SCREEN_WIDTH, bb.SCREEN_HEIGHT))
+    pygame.display.set_caption(f"Castle Defender - watching {host}:{port}")
+    paddle = bb.Paddle(0, bb.SCREEN_HEIGHT - 50)
+    ball = bb.Ball(0, 0)
+    font = bb.safe_font('Arial', 24, bold=True)
+    clock = pygame.time.Clock()
+    received = 0
+    start = time.perf_counter()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+        try:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    running = False
+                    break
+                received += len(data)
+                view.feed(data)
+        except BlockingIOError:
+            pass
+
+        screen.fill(bb.BACKGROUND)
+        if view.synced:
+            for x, y, w, h, color, hits in view.bricks.values():
+                atlas = bb.get_brick_atlas(w, h)
+                screen.blit(atlas.surface, (x, y), atlas.areas[(color, min(hits, bb.BrickAtlas.MAX_HITS))])
+            paddle.rect.x = paddle.prev_x = view.paddle_x
+            paddle.draw(screen)
+            ball.place(*view.ball)
+            ball.snap()
+            ball.draw(screen)
+            hud = f"Score: {view.score}   Lives: {view.lives}   Level: {view.level}"
+        else:
+            hud = "Waiting for the game..."
+        rate = received / max(1e-9, time.perf_counter() - start) / 1024
+        screen.blit(bb.render_text(font, hud, bb.TEXT_COLOR), (10, 10))
+        screen.blit(bb.render_text(font, f"{rate:.1f} KB/s", (150, 150, 200)), (10, 40))
+        pygame.display.flip()
+        clock.tick(bb.FPS)
+    sock.close()
+    pygame.quit()
+
+
+async def _spectate(port, stall):
+    """One loopback spectator; one with a `stall` stops reading for that many seconds after a while."""
+    loop = asyncio.get_running_loop()
+    sock = socket.socket()
+    if stall:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.setblocking(False)
+    await loop.sock_connect(sock, ('127.0.0.1', port))
+    # A small stream limit, so a stalled reader leaves the data in the socket like a slow client would
+    reader, writer = await asyncio.open_connection(sock=sock, limit=1024 if stall else 65536)
+    view = SpectatorView()
+    received = 0
+    stall_at = time.perf_counter() + STALL_AFTER if stall else None
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            break
+        received += len(data)
+        view.feed(data)
+        if stall_at is not None and time.perf_counter() >= stall_at:
+            stall_at = None
+            await asyncio.sleep(stall)
+    writer.close()
+    return view.digest(), received, view.keyframes, view.deltas
+
+
+def _swarm(port, clients, slow, stall, results):
+    """Process running the loopback spectators; sends their outcomes back on `results`."""
+    async def run():
+        tasks = [asyncio.create_task(_spectate(port, stall if i < slow else 0)) for i in range(clients)]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    results.put(asyncio.run(run()))
+
+
+def loopback(clients, slow, stall, seconds, seed, endless=False):
+    """Stream an autopilot game at real speed to `clients` local spectators and check what they saw."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import brick_breaker as bb
+
+    server = BroadcastServer('127.0.0.1', 0)
+    server.start()
+    context = mp.get_context('spawn')
+    results = context.Queue()
+    swarm = context.Process(target=_swarm, args=(server.port, clients, slow, stall, results), daemon=True)
+    swarm.start()
+    deadline = time.perf_counter() + 30
+    while len(server.spectators) < clients and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    print(f"{len(server.spectators)} spectators connected on port {server.port}")
+
+    game = bb.Game(headless=True, seed=seed)
+    if endless:
+        game.reset_game(seed, endless_mode=True)
+    game.broadcast = server
+    game.state = bb.STATE_READY
+    pilot = bb.Autopilot(seed)
+    ticks = int(seconds * bb.TICK_RATE)
+    start = time.perf_counter()
+    latest = 0.0
+    for tick in range(ticks):
+        # Real-time pacing, so the spectators see a normal game
+        target = start + tick * bb.TICK_TIME
+        time.sleep(max(0.0, target - time.perf_counter()))
+        latest = max(latest, time.perf_counter() - target)
+        if game.state == bb.STATE_GAME_OVER:
+            game.reset_game(game.seed + 1, endless)
+            game.state = bb.STATE_READY
+        left, right = pilot(game)
+        game.tick(left, right, game.state in (bb.STATE_READY, bb.STATE_LEVEL_COMPLETE))
+    elapsed = time.perf_counter() - start
+    # One last keyframe, so every spectator should end up with the game's final state
+    game.layout_version += 1
+    server.feed(game)
+    server.close(timeout=10.0)
+
+    outcomes = results.get(timeout=60)
+    swarm.join()
+    expected = game_digest(game)
+    matched = sum(1 for o in outcomes if not isinstance(o, BaseException) and o[0] == expected)
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    print(f"{ticks} ticks in {elapsed:.1f} s, game loop at most {latest * 1000:.1f} ms late")
+    print(server.summary())
+    print(f"{matched} of {clients} spectators ended on the game's final state ({slow} of them slow readers)")
+    for error in errors[:3]:
+        print(f"Warning: spectator failed: {error!r}")
+    return 0 if matched == clients else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Watch brick breaker games over the network.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('watch', help='show a game streamed by brick_breaker.py --spectators')
+    p.add_argument('host')
+    p.add_argument('--port', type=int, default=SPECTATOR_PORT)
+    p = sub.add_parser('loopback', help='stream an autopilot game to many spectators on this machine')
+    p.add_argument('--clients', type=int, default=100)
+    p.add_argument('--slow', type=int, default=5, help='how many of the spectators stop reading for a while')
+    p.add_argument('--stall', type=float, default=20.0, help='seconds the slow spectators stop reading for')
+    p.add_argument('--seconds', type=float, default=30.0)
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--endless', action='store_true', help='stream an endless game')
+    args = parser.parse_args(argv)
+
+    if args.command == 'watch':
+        watch(args.host, args.port)
+        return 0
+    return loopback(args.clients, args.slow, args.stall, args.seconds, args.seed, args.endless)
+
+
+if __name__ == '__main__':
+    sys.exit(main())